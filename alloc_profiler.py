@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Opt-in memory allocation instrumentation for the VRT calculator
+Built on tracemalloc: records peak and retained bytes per Flask route and per
+call in the batch engines, with optional budgets that fail when exceeded
+
+Enable with VRT_ALLOC_PROFILE=true. Budgets are peak bytes per request/call, e.g.
+VRT_ALLOC_BUDGETS="api_calculate=131072,fleet_row=32768", and VRT_ALLOC_STRICT=true
+raises AllocationBudgetExceeded instead of only counting violations.
+tracemalloc is process-wide, so figures are only exact with one request in
+flight per process (sync workers)
+"""
+
+import argparse
+import os
+import sys
+import threading
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Optional
+
+# Default budgets used by the self-check (peak bytes)
+DEFAULT_BUDGETS = {
+    'api_calculate': 256 * 1024,
+    'fleet_row': 32 * 1024,
+}
+
+
+class AllocationBudgetExceeded(Exception):
+    """Raised in strict mode when a request or call allocates more than its budget"""
+
+
+def _parse_budgets(value: str) -> Dict[str, int]:
+    budgets = {}
+    for item in filter(None, (part.strip() for part in value.split(','))):
+        name, _, limit = item.partition('=')
+        budgets[name.strip()] = int(limit)
+    return budgets
+
+
+class AllocationStats:
+    __slots__ = ('calls', 'total_peak_bytes', 'max_peak_bytes', 'total_net_bytes',
+                 'total_net_blocks', 'budget_violations')
+
+    def __init__(self):
+        self.calls = 0
+        self.total_peak_bytes = 0
+        self.max_peak_bytes = 0
+        self.total_net_bytes = 0
+        self.total_net_blocks = 0
+        self.budget_violations = 0
+
+    def to_dict(self, budget: Optional[int]) -> Dict:
+        calls = self.calls or 1
+        return {
+            'calls': self.calls,
+            'avg_peak_bytes': round(self.total_peak_bytes / calls),
+            'max_peak_bytes': self.max_peak_bytes,
+            'avg_net_bytes': round(self.total_net_bytes / calls),
+            'avg_net_blocks': round(self.total_net_blocks / calls, 1),
+            'budget_bytes': budget,
+            'budget_violations': self.budget_violations
+        }
+
+
+class AllocationProfiler:
+    """Collects allocation figures per named route or call"""
+
+    def __init__(self, enabled: bool = False, budgets: Optional[Dict[str, int]] = None,
+                 strict: bool = False):
+        self.enabled = enabled
+        self.budgets = budgets or {}
+        self.strict = strict
+        self._stats: Dict[str, AllocationStats] = {}
+        self._lock = threading.Lock()
+        self._registered_apps = set()
+        self._active = threading.local()
+        if enabled:
+            self.start()
+
+    @classmethod
+    def from_env(cls) -> 'AllocationProfiler':
+        return cls(
+            enabled=os.environ.get('VRT_ALLOC_PROFILE', 'false').lower() == 'true',
+            budgets=_parse_budgets(os.environ.get('VRT_ALLOC_BUDGETS', '')),
+            strict=os.environ.get('VRT_ALLOC_STRICT', 'false').lower() == 'true'
+        )
+
+    def start(self):
+        self.enabled = True
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def begin(self):
+        """Start measuring - returns the token to pass to end()"""
+        current, peak = tracemalloc.get_traced_memory()
+        stack = self._active.__dict__.setdefault('stack', [])
+        if stack:
+            # tracemalloc has a single peak; keep the enclosing measurement's peak so far
+            stack[-1][2] = max(stack[-1][2], peak)
+        tracemalloc.reset_peak()
+        token = [current, sys.getallocatedblocks(), current]
+        stack.append(token)
+        return token
+
+    def end(self, name: str, token):
+        """Finish a measurement started with begin() and record it under name"""
+        start_bytes, start_blocks, peak_seen = token
+        current, peak = tracemalloc.get_traced_memory()
+        self._pop(token)
+        peak_bytes = max(max(peak, peak_seen) - start_bytes, 0)
+        budget = self.budgets.get(name)
+
+        with self._lock:
+            stats = self._stats.setdefault(name, AllocationStats())
+            stats.calls += 1
+            stats.total_peak_bytes += peak_bytes
+            stats.max_peak_bytes = max(stats.max_peak_bytes, peak_bytes)
+            stats.total_net_bytes += current - start_bytes
+            stats.total_net_blocks += sys.getallocatedblocks() - start_blocks
+            over_budget = budget is not None and peak_bytes > budget
+            if over_budget:
+                stats.budget_violations += 1
+
+        if over_budget and self.strict:
+            raise AllocationBudgetExceeded(
+                f"{name} allocated {peak_bytes:,} bytes at peak (budget {budget:,})")
+
+    def discard(self, token):
+        """Drop a measurement started with begin() without recording it"""
+        self._pop(token)
+
+    def _pop(self, token):
+        # Tokens are lists, so compare by identity - another request's token can be equal
+        stack = self._active.__dict__.get('stack', [])
+        for i in range(len(stack) - 1, -1, -1):
+            if stack[i] is token:
+                del stack[i]
+                return
+
+    @contextmanager
+    def _track(self, name: str):
+        token = self.begin()
+        try:
+            yield
+        finally:
+            self.end(name, token)
+
+    def track(self, name: str):
+        """Context manager measuring one call; a no-op unless profiling is enabled"""
+        if not self.enabled:
+            return nullcontext()
+        return self._track(name)
+
+    def summary(self) -> Dict:
+        with self._lock:
+            return {name: stats.to_dict(self.budgets.get(name))
+                    for name, stats in sorted(self._stats.items())}
+
+    def violations(self) -> Dict[str, int]:
+        with self._lock:
+            return {name: stats.budget_violations
+                    for name, stats in self._stats.items() if stats.budget_violations}
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def init_app(self, flask_app):
+        """Record every request under its endpoint name and expose /debug/allocations"""
+        if not self.enabled or id(flask_app) in self._registered_apps:
+            return
+        self._registered_apps.add(id(flask_app))
+
+        from flask import g, jsonify, request
+
+        @flask_app.before_request
+        def _begin_allocation_tracking():
+            g.allocation_token = self.begin()
+
+        @flask_app.teardown_request
+        def _end_allocation_tracking(error=None):
+            # Teardown runs even when the view raised, so the token never outlives its request
+            token = g.pop('allocation_token', None)
+            if token is None:
+                return
+            if request.endpoint == 'allocation_summary':
+                self.discard(token)
+            else:
+                self.end(request.endpoint or 'unknown', token)
+
+        @flask_app.route('/debug/allocations')
+        def allocation_summary():
+            """Per-route and per-call allocation summaries"""
+            return jsonify({'strict': self.strict, 'routes': self.summary()})
+
+
+profiler = AllocationProfiler.from_env()
+
+
+def main():
+    """Exercise /api/calculate and the fleet engine and fail if any budget is exceeded"""
+    parser = argparse.ArgumentParser(description="Check allocation budgets")
+    parser.add_argument('--requests', type=int, default=200, help="/api/calculate requests to make")
+    parser.add_argument('--rows', type=int, default=1000, help="Fleet rows to aggregate")
+    args = parser.parse_args()
+
+    os.environ['VRT_HISTORY_ENABLED'] = 'false'
+    # Use the instance the app imports, not this script's __main__ copy
+    from alloc_profiler import profiler
+    profiler.budgets = dict(DEFAULT_BUDGETS, **profiler.budgets)
+    profiler.start()
+
+    from app import app
+    from fleet_analytics import aggregate_fleet
+    profiler.init_app(app)
+
+    client = app.test_client()
+    for i in range(args.requests):
+        client.post('/api/calculate', json={
+            'uk_price': 5000 + i * 10, 'co2_emissions': 50 + i % 200,
+            'vehicle_age': i % 10, 'import_origin': 'uk' if i % 2 else 'ni'
+        })
+
+    fleet = ({'uk_price': 5000 + i * 10, 'co2_emissions': 50 + i % 200,
+              'vehicle_age': i % 10, 'import_origin': 'uk' if i % 2 else 'ni'}
+             for i in range(args.rows))
+    aggregate_fleet(fleet, exchange_rate=1.17)
+
+    for name, stats in profiler.summary().items():
+        budget = f"{stats['budget_bytes']:,}" if stats['budget_bytes'] else '-'
+        print(f"{name:20} calls={stats['calls']:<6} avg_peak={stats['avg_peak_bytes']:>9,} "
+              f"max_peak={stats['max_peak_bytes']:>9,} budget={budget:>9} "
+              f"violations={stats['budget_violations']}")
+
+    violations = profiler.violations()
+    if violations:
+        print(f"FAIL: allocation budget exceeded - {violations}")
+        sys.exit(1)
+    print("OK: all allocation budgets met")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,41 +3,45 @@
 Flask Web Application for VRT Calculator
 """
 
-from flask import Flask, render_template, request, jsonify, flash, redirect, url_for
-import requests
+from flask import Flask, Response, render_template, request, jsonify, flash, redirect, url_for, session
 from datetime import datetime
+import io
 import json
 import os
 
+from exchange_rates import get_rate_snapshot
+from monte_carlo import DEFAULT_DRAWS, simulate_landed_cost
+from vehicle_specs import get_spec_index
+from history_store import get_history_store
+from rate_stream import broadcaster
+import vrt_core
+from batch_calculator import parse_co2_bands
+from tariff_impact import analyze_fleet, write_impact_csv
+import static_assets
+from alloc_profiler import profiler
+from page_cache import (CALCULATION_DATE_PLACEHOLDER, RenderedPageCache,
+                        enable_bytecode_cache, result_cache_key)
+
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', 'your-secret-key-change-this')
 
+# Compiled templates are shared on disk between workers and restarts
+enable_bytecode_cache(app)
+
+# Content-hashed, precompressed static assets (built by static_assets.py)
+static_assets.init_app(app)
+
+# Per-route allocation instrumentation (VRT_ALLOC_PROFILE=true)
+profiler.init_app(app)
+
+# Rendered results pages for repeated inputs
+results_page_cache = RenderedPageCache(int(os.environ.get('RESULTS_PAGE_CACHE_SIZE', 256)))
+
 class VRTCalculatorWeb:
     def __init__(self):
-        # Official VRT rates from Irish Revenue (Category A) - 2024
-        # Format: (min_co2, max_co2): (rate_percent, minimum_amount_eur)
-        self.co2_bands = [
-            (0, 50, 7, 140),
-            (51, 80, 9, 180),
-            (81, 85, 9.75, 195),
-            (86, 90, 10.5, 210),
-            (91, 95, 11.25, 225),
-            (96, 100, 12, 240),
-            (101, 105, 12.75, 255),
-            (106, 110, 13.5, 270),
-            (111, 115, 15.25, 305),
-            (116, 120, 16, 320),
-            (121, 125, 16.75, 335),
-            (126, 130, 17.5, 350),
-            (131, 135, 19.25, 385),
-            (136, 140, 20, 400),
-            (141, 145, 21.5, 430),
-            (146, 150, 25, 500),
-            (151, 155, 27.5, 550),
-            (156, 170, 30, 600),
-            (171, 190, 35, 700),
-            (191, float('inf'), 41, 820)
-        ]
+        # Official VRT rates from Irish Revenue (Category A), shared with every calculator via vrt_core
+        # Format: (min_co2, max_co2, rate_percent, minimum_amount_eur)
+        self.co2_bands = list(vrt_core.CO2_BANDS)
         
         # Fuel type multipliers (if any - keeping for compatibility)
         self.fuel_type_info = {
@@ -46,146 +50,174 @@ class VRTCalculatorWeb:
             'electric': {'name': 'Electric'},
             'hybrid': {'name': 'Hybrid'}
         }
+        
+        # Per-g/km band lookup, built on first use (or up front by warmup.py)
+        self._band_table = None
     
-    def get_current_exchange_rate(self):
-        """Get current GBP to EUR exchange rate"""
-        try:
-            url = "https://api.exchangerate-api.com/v4/latest/GBP"
-            response = requests.get(url, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                return data['rates'].get('EUR', 1.17)
-        except Exception:
-            pass
-        
-        return 1.17  # Fallback rate
+    def get_rate_snapshot(self, force_refresh=False):
+        """Get the cached snapshot of all exchange rates (one API fetch covers every currency)"""
+        return get_rate_snapshot(force_refresh)
+    
+    def get_current_exchange_rate(self, source_currency='GBP'):
+        """Get current exchange rate from source_currency to EUR"""
+        return self.get_rate_snapshot().rate(source_currency, 'EUR')
+    
+    def build_lookup_tables(self):
+        """
+        Build the core band table for co2_bands (a per-g/km table of rate and minimum)
+        Call again after changing co2_bands
+        """
+        if self._band_table is None or self._band_table.co2_bands != tuple(self.co2_bands):
+            self._band_table = vrt_core.BandTable(self.co2_bands)
+        return self._band_table.lookup
+    
+    @property
+    def band_table(self):
+        if self._band_table is None:
+            self.build_lookup_tables()
+        return self._band_table
     
     def get_co2_rate_and_minimum(self, co2_emissions):
         """Get VRT percentage rate and minimum amount based on CO2 emissions"""
-        for min_co2, max_co2, rate, minimum in self.co2_bands:
-            if min_co2 <= co2_emissions <= max_co2:
-                return rate, minimum
-        # Default to highest rate if not found
-        return 41, 820
+        return self.band_table.rate_and_minimum(co2_emissions)
+    
+    def get_tariff_version(self):
+        """Short hash of the CO2 band table - changes whenever the bands change"""
+        return self.band_table.version
+    
+    def get_co2_band_label(self, co2_emissions):
+        """Get the CO2 band label (e.g. '146-150') for the given emissions"""
+        return self.band_table.label(co2_emissions)
     
     def estimate_transport_costs(self, vehicle_value, transport_method='ferry'):
         """Estimate transport and associated costs"""
-        costs = {
-            'transport': 300 if transport_method.lower() == 'ferry' else 150,
-            'insurance': vehicle_value * 0.015,
-            'customs_clearance': 50
-        }
-        costs['total'] = sum(costs.values())
-        return costs
+        return vrt_core.transport_costs(vehicle_value, transport_method)
     
     def estimate_motor_tax(self, co2_emissions, fuel_type):
         """
         Estimate annual motor tax based on CO2 emissions
         Rates are approximate - actual rates depend on year of registration
         """
-        if fuel_type.lower() == 'electric':
-            return 120  # Electric vehicle rate
-        
-        # Motor tax bands (approximate rates for recent vehicles)
-        if co2_emissions <= 80:
-            return 120
-        elif co2_emissions <= 100:
-            return 170
-        elif co2_emissions <= 110:
-            return 190
-        elif co2_emissions <= 120:
-            return 200
-        elif co2_emissions <= 130:
-            return 270
-        elif co2_emissions <= 140:
-            return 330
-        elif co2_emissions <= 155:
-            return 481
-        elif co2_emissions <= 170:
-            return 677
-        elif co2_emissions <= 190:
-            return 920
-        else:
-            return 1200  # High emission vehicles
+        return vrt_core.motor_tax(co2_emissions, fuel_type)
     
     def calculate_comprehensive_costs(self, uk_price_gbp, co2_emissions, fuel_type, 
-                                    vehicle_age_years=0, transport_method='ferry', import_origin='uk'):
-        """Calculate all costs associated with importing a vehicle"""
-        
-        # Get current exchange rate
-        exchange_rate = self.get_current_exchange_rate()
+                                    vehicle_age_years=0, transport_method='ferry', import_origin='uk',
+                                    exchange_rate=None, source_currency='GBP', uncertainty_draws=0):
+        """
+        Calculate all costs associated with importing a vehicle
+        uk_price_gbp is the purchase price in source_currency (GBP unless stated)
+        With uncertainty_draws > 0 the result also carries a Monte Carlo distribution
+        of the total import cost under 'uncertainty'
+        """
+        shared = self.prepare_shared_stages(uk_price_gbp, co2_emissions, fuel_type,
+                                            exchange_rate, source_currency)
+        result = self.price_scenario(shared, vehicle_age_years, transport_method, import_origin)
         
-        # Convert UK price to EUR
-        vehicle_value_eur = uk_price_gbp * exchange_rate
+        if uncertainty_draws:
+            with profiler.track('monte_carlo'):
+                result['uncertainty'] = simulate_landed_cost(
+                    shared['purchase_price'], shared['exchange_rate'], shared['co2_rate'],
+                    shared['vrt_minimum'], vehicle_age_years, transport_method, import_origin,
+                    draws=uncertainty_draws
+                )
         
-        # Calculate transport costs
-        transport_costs = self.estimate_transport_costs(vehicle_value_eur, transport_method)
+        return result
+    
+    def compare_scenarios(self, uk_price_gbp, co2_emissions, fuel_type, scenarios,
+                          exchange_rate=None, source_currency='GBP'):
+        """
+        Price one vehicle under several scenarios (origin, transport method, age)
+        The rate fetch, EUR value and band lookup are done once and shared
+        """
+        with profiler.track('compare_scenarios'):
+            shared = self.prepare_shared_stages(uk_price_gbp, co2_emissions, fuel_type,
+                                                exchange_rate, source_currency)
+            results = []
+            for scenario in scenarios:
+                results.append(self.price_scenario(
+                    shared,
+                    int(scenario.get('vehicle_age', 0)),
+                    scenario.get('transport_method', 'ferry'),
+                    scenario.get('import_origin', 'uk')
+                ))
+        return results
+    
+    def prepare_shared_stages(self, uk_price_gbp, co2_emissions, fuel_type,
+                              exchange_rate=None, source_currency='GBP'):
+        """Stages that depend only on the vehicle: exchange rate, EUR value, CO2 band and motor tax"""
+        source_currency = source_currency.upper()
+        snapshot = self.get_rate_snapshot()
         
-        # Calculate OMV (Open Market Value)
-        omv = vehicle_value_eur + transport_costs['total']
+        # Get current exchange rate (batch callers pass one in to avoid a fetch per vehicle)
+        if exchange_rate is None:
+            exchange_rate = snapshot.rate(source_currency, 'EUR')
         
-        # Calculate Customs Duty (10% of vehicle value for UK, 0% for Northern Ireland)
-        customs_duty = vehicle_value_eur * 0.10 if import_origin.lower() == 'uk' else 0.0
+        # Convert purchase price to EUR
+        purchase_price = uk_price_gbp
+        vehicle_value_eur = purchase_price * exchange_rate
+        if source_currency != 'GBP':
+            uk_price_gbp = round(snapshot.convert(purchase_price, source_currency, 'GBP'), 2)
         
-        # Calculate VRT using official Irish Revenue rates
+        # VRT band using official Irish Revenue rates
         co2_rate, vrt_minimum = self.get_co2_rate_and_minimum(co2_emissions)
-        base_vrt = omv * (co2_rate / 100)
-        
-        # Apply age depreciation if applicable
-        if vehicle_age_years > 0:
-            depreciation_rate = min(vehicle_age_years * 0.02, 0.1)
-            base_vrt = base_vrt * (1 - depreciation_rate)
-        
-        # Apply minimum VRT (whichever is greater: calculated VRT or minimum)
-        final_vrt = max(base_vrt, vrt_minimum)
-        
-        # Calculate VAT (21% on vehicle value + customs duty + VRT)
-        vat_base = vehicle_value_eur + customs_duty + final_vrt
-        vat_amount = vat_base * 0.21
-        
-        # Calculate motor tax
-        motor_tax = self.estimate_motor_tax(co2_emissions, fuel_type)
-        
-        # Calculate total import cost
-        total_import_cost = (vehicle_value_eur + transport_costs['total'] + 
-                           customs_duty + final_vrt + vat_amount + 102)
         
         return {
-            'purchase_details': {
-                'uk_price_gbp': uk_price_gbp,
-                'exchange_rate': round(exchange_rate, 4),
-                'vehicle_value_eur': round(vehicle_value_eur, 2),
-                'import_origin': import_origin.upper()
-            },
-            'transport_costs': {k: round(v, 2) for k, v in transport_costs.items()},
-            'omv': round(omv, 2),
-            'customs_duty': round(customs_duty, 2),
-            'customs_duty_applicable': import_origin.lower() == 'uk',
-            'vrt_calculation': {
-                'co2_emissions': co2_emissions,
-                'co2_rate_percent': co2_rate,
-                'base_vrt': round(base_vrt, 2),
-                'minimum_vrt': vrt_minimum,
-                'final_vrt': round(final_vrt, 2)
-            },
-            'vat_calculation': {
-                'vat_base': round(vat_base, 2),
-                'vat_rate_percent': 21,
-                'vat_amount': round(vat_amount, 2)
-            },
-            'additional_costs': {
-                'motor_tax_annual': motor_tax,
-                'nct_test': 55 if vehicle_age_years >= 4 else 0,
-                'registration_fee': 102
-            },
-            'total_import_cost': round(total_import_cost, 2),
-            'calculation_date': datetime.now().isoformat()
+            'purchase_price': purchase_price,
+            'uk_price_gbp': uk_price_gbp,
+            'source_currency': source_currency,
+            'exchange_rate': exchange_rate,
+            'vehicle_value_eur': vehicle_value_eur,
+            'co2_emissions': co2_emissions,
+            'fuel_type': fuel_type,
+            'co2_rate': co2_rate,
+            'vrt_minimum': vrt_minimum,
+            'motor_tax': self.estimate_motor_tax(co2_emissions, fuel_type)
         }
+    
+    def price_scenario(self, shared, vehicle_age_years=0, transport_method='ferry', import_origin='uk'):
+        """Stages that vary per scenario: transport, customs duty, depreciation, VRT, VAT and totals"""
+        costs = vrt_core.price_scenario(shared['vehicle_value_eur'], shared['co2_rate'], shared['vrt_minimum'],
+                                        vehicle_age_years, transport_method, import_origin)
+        costs.update(co2_emissions=shared['co2_emissions'], motor_tax_annual=shared['motor_tax'])
+        
+        return vrt_core.build_result(costs, vrt_core.purchase_details(
+            shared['uk_price_gbp'], shared['exchange_rate'], shared['vehicle_value_eur'],
+            import_origin, shared['fuel_type'], vehicle_age_years, transport_method,
+            shared['purchase_price'], shared['source_currency']
+        ))
 
 # Initialize calculator
 calculator = VRTCalculatorWeb()
 
+def render_results_page(result):
+    """Render results.html, reusing the cached page when the same result was rendered before"""
+    # Flashed messages are part of the page, so don't cache around them
+    if session.get('_flashes'):
+        return render_template('results.html', result=result)
+    
+    key = result_cache_key(result, calculator.get_tariff_version(),
+                           calculator.get_rate_snapshot().fetched_at.isoformat())
+    page = results_page_cache.get(key)
+    if page is None:
+        page = render_template('results.html',
+                               result=dict(result, calculation_date=CALCULATION_DATE_PLACEHOLDER))
+        results_page_cache.put(key, page)
+    
+    calculation_date = result['calculation_date'][:19].replace('T', ' ')
+    return page.replace(CALCULATION_DATE_PLACEHOLDER, calculation_date)
+
+# Calculation history (set VRT_HISTORY_ENABLED=false to turn off)
+HISTORY_ENABLED = os.environ.get('VRT_HISTORY_ENABLED', 'true').lower() == 'true'
+
+def record_history(result):
+    """Append a result to the calculation history without failing the request"""
+    if not HISTORY_ENABLED:
+        return
+    try:
+        get_history_store().append(result)
+    except Exception as e:
+        app.logger.warning(f"Could not record calculation history: {e}")
+
 @app.route('/')
 def index():
     """Main calculator page"""
@@ -202,6 +234,7 @@ def calculate():
         vehicle_age = int(request.form.get('vehicle_age', 0))
         transport_method = request.form.get('transport_method', 'ferry')
         import_origin = request.form.get('import_origin', 'uk')
+        source_currency = request.form.get('source_currency', 'GBP')
         
         # Validate inputs
         if uk_price <= 0:
@@ -214,10 +247,12 @@ def calculate():
         
         # Calculate costs
         result = calculator.calculate_comprehensive_costs(
-            uk_price, co2_emissions, fuel_type, vehicle_age, transport_method, import_origin
+            uk_price, co2_emissions, fuel_type, vehicle_age, transport_method, import_origin,
+            source_currency=source_currency
         )
+        record_history(result)
         
-        return render_template('results.html', result=result)
+        return render_results_page(result)
         
     except ValueError as e:
         flash(f'Invalid input: {str(e)}', 'error')
@@ -238,28 +273,243 @@ def api_calculate():
         vehicle_age = int(data.get('vehicle_age', 0))
         transport_method = data.get('transport_method', 'ferry')
         import_origin = data.get('import_origin', 'uk')
+        source_currency = data.get('source_currency', 'GBP')
         
         if uk_price <= 0 or co2_emissions <= 0:
             return jsonify({'error': 'Invalid input values'}), 400
         
+        if source_currency.upper() not in calculator.get_rate_snapshot():
+            return jsonify({'error': f'Unsupported currency: {source_currency}'}), 400
+        
         result = calculator.calculate_comprehensive_costs(
-            uk_price, co2_emissions, fuel_type, vehicle_age, transport_method, import_origin
+            uk_price, co2_emissions, fuel_type, vehicle_age, transport_method, import_origin,
+            source_currency=source_currency
         )
+        record_history(result)
         
         return jsonify(result)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/cost-distribution', methods=['POST'])
+def api_cost_distribution():
+    """API endpoint for the Monte Carlo distribution of total import cost"""
+    try:
+        data = request.get_json()
+        
+        uk_price = float(data.get('uk_price', 0))
+        co2_emissions = int(data.get('co2_emissions', 0))
+        fuel_type = data.get('fuel_type', 'petrol')
+        vehicle_age = int(data.get('vehicle_age', 0))
+        transport_method = data.get('transport_method', 'ferry')
+        import_origin = data.get('import_origin', 'uk')
+        source_currency = data.get('source_currency', 'GBP')
+        draws = int(data.get('draws', DEFAULT_DRAWS))
+        
+        if uk_price <= 0 or co2_emissions <= 0 or draws <= 0:
+            return jsonify({'error': 'Invalid input values'}), 400
+        
+        if source_currency.upper() not in calculator.get_rate_snapshot():
+            return jsonify({'error': f'Unsupported currency: {source_currency}'}), 400
+        
+        result = calculator.calculate_comprehensive_costs(
+            uk_price, co2_emissions, fuel_type, vehicle_age, transport_method, import_origin,
+            source_currency=source_currency, uncertainty_draws=draws
+        )
+        
+        return jsonify(result)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/compare', methods=['POST'])
+def api_compare():
+    """
+    API endpoint comparing one vehicle across scenarios
+    Body: vehicle fields as for /api/calculate plus 'scenarios', a list of
+    overrides for import_origin, transport_method and vehicle_age
+    """
+    try:
+        data = request.get_json()
+        
+        uk_price = float(data.get('uk_price', 0))
+        co2_emissions = int(data.get('co2_emissions', 0))
+        fuel_type = data.get('fuel_type', 'petrol')
+        source_currency = data.get('source_currency', 'GBP')
+        scenarios = data.get('scenarios') or []
+        
+        if uk_price <= 0 or co2_emissions <= 0:
+            return jsonify({'error': 'Invalid input values'}), 400
+        
+        if not isinstance(scenarios, list) or not scenarios or len(scenarios) > 50:
+            return jsonify({'error': 'Provide between 1 and 50 scenarios'}), 400
+        
+        if not all(isinstance(scenario, dict) for scenario in scenarios):
+            return jsonify({'error': 'Each scenario must be an object'}), 400
+        
+        if source_currency.upper() not in calculator.get_rate_snapshot():
+            return jsonify({'error': f'Unsupported currency: {source_currency}'}), 400
+        
+        # Scenario fields default to the vehicle's own values
+        defaults = {
+            'vehicle_age': data.get('vehicle_age', 0),
+            'transport_method': data.get('transport_method', 'ferry'),
+            'import_origin': data.get('import_origin', 'uk')
+        }
+        scenarios = [dict(defaults, **scenario) for scenario in scenarios]
+        
+        results = calculator.compare_scenarios(
+            uk_price, co2_emissions, fuel_type, scenarios, source_currency=source_currency
+        )
+        
+        return jsonify({
+            'scenarios': [
+                {'scenario': scenario, 'result': result}
+                for scenario, result in zip(scenarios, results)
+            ],
+            'cheapest_index': min(range(len(results)), key=lambda i: results[i]['total_import_cost'])
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/tariff-impact', methods=['POST'])
+def api_tariff_impact():
+    """
+    API endpoint comparing a proposed CO2 band table with the current one over a fleet
+    Multipart form: 'fleet' CSV file (columns as for fleet_analytics.py), 'proposed_bands'
+    JSON list of [min_co2, max_co2, rate_percent, minimum_eur] (field or file) and optional
+    'exchange_rate'. Returns the summary, or per-vehicle rows with ?format=csv
+    """
+    try:
+        fleet_file = request.files.get('fleet')
+        if fleet_file is None:
+            return jsonify({'error': 'Missing fleet file'}), 400
+        
+        bands_file = request.files.get('proposed_bands')
+        bands_json = bands_file.read().decode('utf-8') if bands_file else request.form.get('proposed_bands')
+        if not bands_json:
+            return jsonify({'error': 'Missing proposed_bands'}), 400
+        try:
+            proposed_bands = parse_co2_bands(json.loads(bands_json))
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': f'Invalid proposed_bands: {e}'}), 400
+        
+        # type=float would fall back to the live rate on bad input, so parse it explicitly
+        if request.form.get('exchange_rate', '').strip():
+            try:
+                exchange_rate = float(request.form['exchange_rate'])
+            except ValueError:
+                exchange_rate = None
+            if exchange_rate is None or not 0 < exchange_rate < float('inf'):
+                return jsonify({'error': 'exchange_rate must be a positive number'}), 400
+        else:
+            exchange_rate = calculator.get_current_exchange_rate()
+        
+        fleet = io.TextIOWrapper(fleet_file.stream, encoding='utf-8', newline='')
+        try:
+            impact, summary = analyze_fleet(calculator.co2_bands, proposed_bands, fleet, exchange_rate,
+                                            calculator.get_rate_snapshot())
+        except (KeyError, ValueError, StopIteration) as e:
+            return jsonify({'error': f'Invalid fleet file: {e!r}'}), 400
+        
+        if request.args.get('format') == 'csv':
+            output = io.StringIO()
+            write_impact_csv(impact, output, calculator.co2_bands, proposed_bands)
+            return Response(output.getvalue(), mimetype='text/csv', headers={
+                'Content-Disposition': 'attachment; filename=tariff_impact.csv'
+            })
+        
+        summary['exchange_rate'] = exchange_rate
+        return jsonify(summary)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/exchange-rate')
 def get_exchange_rate():
     """API endpoint to get current exchange rate"""
     try:
-        rate = calculator.get_current_exchange_rate()
-        return jsonify({
-            'gbp_to_eur': rate,
-            'timestamp': datetime.now().isoformat()
-        })
+        snapshot = calculator.get_rate_snapshot()
+        response = {
+            'gbp_to_eur': snapshot.rate('GBP', 'EUR'),
+            'timestamp': snapshot.fetched_at.isoformat()
+        }
+        
+        # Optional ?currency=USD adds that currency's rate to EUR from the same snapshot
+        currency = request.args.get('currency')
+        if currency:
+            if currency.upper() not in snapshot:
+                return jsonify({'error': f'Unsupported currency: {currency}'}), 400
+            response[f'{currency.lower()}_to_eur'] = snapshot.rate(currency, 'EUR')
+        
+        return jsonify(response)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/exchange-rate/stream')
+def stream_exchange_rate():
+    """Server-sent events with the GBP to EUR rate, pushed to every browser when it changes"""
+    # The generator needs no request context, so open streams don't each hold one
+    response = Response(broadcaster.events(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop nginx buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/api/vehicle-specs')
+def get_vehicle_specs():
+    """API endpoint for exact vehicle spec lookup by make/model/variant/year key"""
+    key = request.args.get('key', '')
+    if not key:
+        return jsonify({'error': 'Missing key parameter'}), 400
+    
+    try:
+        specs = get_spec_index().lookup(key)
+    except (OSError, ValueError):
+        return jsonify({'error': 'Vehicle spec database is unavailable'}), 503
+    if specs is None:
+        return jsonify({'error': f'No vehicle specs found for {key}'}), 404
+    return jsonify(specs)
+
+@app.route('/api/vehicle-specs/autocomplete')
+def autocomplete_vehicle_specs():
+    """API endpoint for make/model/variant/year autocomplete"""
+    prefix = request.args.get('q', '')
+    # type=int falls back to the default on bad input, so reject that explicitly
+    limit = request.args.get('limit', 10, type=int)
+    if ('limit' in request.args and not request.args['limit'].strip().isdigit()) or not 1 <= limit <= 50:
+        return jsonify({'error': 'limit must be a whole number between 1 and 50'}), 400
+    try:
+        return jsonify({'matches': get_spec_index().autocomplete(prefix, limit)})
+    except (OSError, ValueError):
+        return jsonify({'error': 'Vehicle spec database is unavailable'}), 503
+
+@app.route('/api/history')
+def get_history():
+    """
+    API endpoint for calculation history
+    Query parameters: limit, since/until (ISO date/time), co2_band (e.g. 146-150), origin, fuel_type
+    """
+    try:
+        limit = min(int(request.args.get('limit', 20)), 1000)
+        since = request.args.get('since')
+        until = request.args.get('until')
+        
+        records = get_history_store().query(
+            since=datetime.fromisoformat(since).timestamp() if since else None,
+            until=datetime.fromisoformat(until).timestamp() if until else None,
+            co2_band=request.args.get('co2_band'),
+            origin=request.args.get('origin'),
+            fuel_type=request.args.get('fuel_type'),
+            limit=limit
+        )
+        
+        return jsonify({'count': len(records), 'records': records})
+        
+    except ValueError as e:
+        return jsonify({'error': f'Invalid query: {e}'}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -272,16 +522,17 @@ def about():
 def get_vrt_bands():
     """API endpoint to get current VRT bands"""
     bands = []
-    for (min_co2, max_co2), rate in calculator.co2_bands.items():
+    for min_co2, max_co2, rate, minimum in calculator.co2_bands:
         bands.append({
             'min_co2': min_co2,
             'max_co2': max_co2 if max_co2 != float('inf') else 'unlimited',
-            'rate_percent': rate
+            'rate_percent': rate,
+            'minimum_vrt': minimum
         })
     
     return jsonify({
         'co2_bands': bands,
-        'minimum_vrt': calculator.minimum_vrt
+        'tariff_version': calculator.get_tariff_version()
     })
 
 if __name__ == '__main__':
@@ -0,0 +1,293 @@
+"""
+Vectorised batch pricing for the VRT calculator
+The array form of the vrt_core formula: prices many vehicles at once with NumPy,
+step for step the same as vrt_core.calculate_costs, and keeps the results as
+flat typed columns rather than one nested dict per vehicle
+"""
+
+import csv
+import json
+from array import array
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+import vrt_core
+
+# Categorical columns are stored as small integer codes into these tuples
+ORIGINS = ('uk', 'ni')
+TRANSPORT_METHODS = ('ferry', 'drive')
+FUEL_TYPES = ('petrol', 'diesel', 'hybrid', 'electric', 'other')
+
+CATEGORIES = {
+    'import_origin': ORIGINS,
+    'transport_method': TRANSPORT_METHODS,
+    'fuel_type': FUEL_TYPES
+}
+
+# Motor tax bands from vrt_core: upper CO2 bound -> annual rate
+MOTOR_TAX_BOUNDS = np.array([max_co2 for max_co2, _ in vrt_core.MOTOR_TAX_BANDS[:-1]])
+MOTOR_TAX_RATES = np.array([rate for _, rate in vrt_core.MOTOR_TAX_BANDS])
+
+# Output column order (inputs first, then each calculation stage)
+COLUMNS = (
+    'uk_price_gbp', 'exchange_rate', 'vehicle_value_eur', 'import_origin', 'fuel_type',
+    'vehicle_age_years', 'transport_method', 'co2_emissions', 'co2_rate_percent',
+    'transport', 'insurance', 'customs_clearance', 'transport_total', 'omv',
+    'customs_duty', 'base_vrt', 'minimum_vrt', 'final_vrt', 'vat_base', 'vat_amount',
+    'motor_tax_annual', 'nct_test', 'registration_fee', 'total_import_cost'
+)
+
+
+def encode(values: Sequence[str], categories: Sequence[str], default: int = -1) -> np.ndarray:
+    """Encode strings as int8 codes into categories (unknown values get default, or the last category)"""
+    lookup = {name: code for code, name in enumerate(categories)}
+    fallback = default if default >= 0 else len(categories) - 1
+    return np.fromiter((lookup.get((v or '').lower(), fallback) for v in values),
+                       dtype=np.int8, count=len(values))
+
+
+def decode(codes: np.ndarray, categories: Sequence[str]) -> List[str]:
+    return [categories[code] for code in codes]
+
+
+def parse_co2_bands(rows) -> List[tuple]:
+    """
+    CO2 band table from JSON-style rows of [min_co2, max_co2, rate_percent, minimum_eur],
+    the same layout as VRTCalculatorWeb.co2_bands with null as max_co2 for the open top band
+    Raises ValueError unless each band starts one g/km after the previous one ends
+    """
+    bands = []
+    for min_co2, max_co2, rate, minimum in rows:
+        bands.append((min_co2, float('inf') if max_co2 is None else max_co2, rate, minimum))
+    if not bands:
+        raise ValueError("CO2 bands must be a non-empty list")
+    # Bands must tile the CO2 range with no gaps or overlaps: lookup_bands (searchsorted on
+    # max_co2) and vrt_core.BandTable (range scan) only agree on a contiguous table
+    for i, (min_co2, max_co2, _, _) in enumerate(bands):
+        if min_co2 > max_co2:
+            raise ValueError(f"CO2 band {i + 1} has min_co2 {min_co2} above max_co2 {max_co2}")
+        if i and min_co2 != bands[i - 1][1] + 1:
+            raise ValueError(f"CO2 band {i + 1} starts at {min_co2} but the previous band ends at "
+                             f"{bands[i - 1][1]} - bands must be contiguous and in ascending order")
+    return bands
+
+
+def load_co2_bands(path: str) -> List[tuple]:
+    """Read a CO2 band table from a JSON file (see parse_co2_bands)"""
+    with open(path) as f:
+        return parse_co2_bands(json.load(f))
+
+
+def band_labels(co2_bands) -> List[str]:
+    """Band labels as used in reports, e.g. '146-150' and '191+'"""
+    return [f"{min_co2}+" if max_co2 == float('inf') else f"{min_co2}-{max_co2}"
+            for min_co2, max_co2, _, _ in co2_bands]
+
+
+def band_arrays(co2_bands) -> Dict[str, np.ndarray]:
+    """CO2 band table as parallel arrays (upper bounds, rates, minimums)"""
+    return {
+        'max_co2': np.array([band[1] for band in co2_bands], dtype=np.float64),
+        'rate': np.array([band[2] for band in co2_bands], dtype=np.float64),
+        'minimum': np.array([band[3] for band in co2_bands], dtype=np.float64)
+    }
+
+
+def lookup_bands(co2_emissions: np.ndarray, co2_bands) -> Dict[str, np.ndarray]:
+    """Band index, rate and minimum for every vehicle in one searchsorted pass"""
+    bands = band_arrays(co2_bands)
+    index = np.searchsorted(bands['max_co2'], co2_emissions, side='left')
+    index = np.minimum(index, len(co2_bands) - 1)
+    return {'band_index': index, 'rate': bands['rate'][index], 'minimum': bands['minimum'][index]}
+
+
+def calculate_batch(co2_bands, uk_price_gbp, co2_emissions, exchange_rate,
+                    fuel_type=None, vehicle_age_years=None,
+                    transport_method=None, import_origin=None) -> Dict[str, np.ndarray]:
+    """
+    Price a batch of vehicles
+    Numeric inputs are arrays (exchange_rate may be a scalar); categorical inputs
+    are int8 code arrays from encode(). Returns one array per name in COLUMNS,
+    money rounded to cents as vrt_core.round_cents does
+    """
+    uk_price_gbp = np.asarray(uk_price_gbp, dtype=np.float64)
+    co2_emissions = np.asarray(co2_emissions, dtype=np.int32)
+    count = len(uk_price_gbp)
+    exchange_rate = np.broadcast_to(np.asarray(exchange_rate, dtype=np.float64), (count,))
+    fuel_type = np.zeros(count, np.int8) if fuel_type is None else np.asarray(fuel_type, np.int8)
+    vehicle_age_years = (np.zeros(count, np.int16) if vehicle_age_years is None
+                         else np.asarray(vehicle_age_years, np.int16))
+    transport_method = (np.zeros(count, np.int8) if transport_method is None
+                        else np.asarray(transport_method, np.int8))
+    import_origin = np.zeros(count, np.int8) if import_origin is None else np.asarray(import_origin, np.int8)
+
+    vehicle_value_eur = uk_price_gbp * exchange_rate
+
+    # Transport costs (ferry or drive), transit insurance, clearance
+    transport = np.where(transport_method == TRANSPORT_METHODS.index('ferry'),
+                         float(vrt_core.TRANSPORT_COSTS['ferry']), float(vrt_core.TRANSPORT_COSTS['drive']))
+    insurance = vehicle_value_eur * vrt_core.TRANSIT_INSURANCE_RATE
+    customs_clearance = np.full(count, float(vrt_core.CUSTOMS_CLEARANCE))
+    transport_total = transport + insurance + customs_clearance
+
+    omv = vehicle_value_eur + transport_total
+
+    # Customs duty applies to UK (not Northern Ireland) imports
+    uk_origin = import_origin == ORIGINS.index('uk')
+    customs_duty = np.where(uk_origin, vehicle_value_eur * vrt_core.CUSTOMS_DUTY_RATE, 0.0)
+
+    bands = lookup_bands(co2_emissions, co2_bands)
+    base_vrt = omv * (bands['rate'] / 100)
+    depreciation_rate = np.where(vehicle_age_years > 0,
+                                 np.minimum(vehicle_age_years * vrt_core.DEPRECIATION_PER_YEAR,
+                                            vrt_core.MAX_DEPRECIATION), 0.0)
+    base_vrt = base_vrt * (1 - depreciation_rate)
+    final_vrt = np.maximum(base_vrt, bands['minimum'])
+
+    vat_base = vehicle_value_eur + customs_duty + final_vrt
+    vat_amount = vat_base * vrt_core.VAT_RATE
+
+    electric = fuel_type == FUEL_TYPES.index('electric')
+    motor_tax = np.where(electric, vrt_core.ELECTRIC_MOTOR_TAX,
+                         MOTOR_TAX_RATES[np.searchsorted(MOTOR_TAX_BOUNDS, co2_emissions, side='left')])
+
+    total_import_cost = omv + customs_duty + final_vrt + vat_amount + vrt_core.REGISTRATION_FEE
+
+    return {
+        'uk_price_gbp': uk_price_gbp,
+        'exchange_rate': np.ascontiguousarray(exchange_rate),
+        'vehicle_value_eur': vehicle_value_eur.round(2),
+        'import_origin': import_origin,
+        'fuel_type': fuel_type,
+        'vehicle_age_years': vehicle_age_years,
+        'transport_method': transport_method,
+        'co2_emissions': co2_emissions,
+        'co2_rate_percent': bands['rate'],
+        'transport': transport,
+        'insurance': insurance.round(2),
+        'customs_clearance': customs_clearance,
+        'transport_total': transport_total.round(2),
+        'omv': omv.round(2),
+        'customs_duty': customs_duty.round(2),
+        'base_vrt': base_vrt.round(2),
+        'minimum_vrt': bands['minimum'],
+        'final_vrt': final_vrt.round(2),
+        'vat_base': vat_base.round(2),
+        'vat_amount': vat_amount.round(2),
+        'motor_tax_annual': motor_tax.astype(np.int16),
+        'nct_test': np.where(vehicle_age_years >= vrt_core.NCT_MIN_AGE_YEARS, vrt_core.NCT_FEE, 0).astype(np.int16),
+        'registration_fee': np.full(count, vrt_core.REGISTRATION_FEE, dtype=np.int16),
+        'total_import_cost': total_import_cost.round(2)
+    }
+
+
+def read_fleet_columns(source) -> Dict[str, np.ndarray]:
+    """
+    Read a fleet CSV (same columns as fleet_analytics.py) straight into typed columns
+    source is a path or an open text file. Rows are appended to compact arrays as
+    they are read; no per-row dicts are built. purchase_price is in each row's
+    source_currency, which is returned as int16 codes into 'currencies' (GBP is
+    always code 0)
+    """
+    if isinstance(source, str):
+        with open(source, newline='') as f:
+            return read_fleet_columns(f)
+
+    prices, co2, ages, currency = array('d'), array('i'), array('h'), array('h')
+    fuel, transport, origin = array('b'), array('b'), array('b')
+    currency_codes = {'GBP': 0}
+    fuel_codes = {name: code for code, name in enumerate(FUEL_TYPES)}
+    transport_codes = {name: code for code, name in enumerate(TRANSPORT_METHODS)}
+    origin_codes = {name: code for code, name in enumerate(ORIGINS)}
+
+    reader = csv.reader(source)
+    header = next(reader)
+    position = {name.strip(): i for i, name in enumerate(header)}
+    price_at, co2_at = position['uk_price'], position['co2_emissions']
+    fuel_at = position.get('fuel_type')
+    age_at = position.get('vehicle_age')
+    transport_at = position.get('transport_method')
+    origin_at = position.get('import_origin')
+    currency_at = position.get('source_currency')
+
+    for row in reader:
+        if not row:
+            continue
+        prices.append(float(row[price_at]))
+        co2.append(int(row[co2_at]))
+        ages.append(int(row[age_at] or 0) if age_at is not None else 0)
+        fuel.append(fuel_codes.get(row[fuel_at].lower(), len(FUEL_TYPES) - 1)
+                    if fuel_at is not None and row[fuel_at] else 0)
+        transport.append(transport_codes.get(row[transport_at].lower(), 1)
+                         if transport_at is not None and row[transport_at] else 0)
+        origin.append(origin_codes.get(row[origin_at].lower(), 1)
+                      if origin_at is not None and row[origin_at] else 0)
+        code = ((row[currency_at].strip().upper() or 'GBP') if currency_at is not None else 'GBP')
+        currency.append(currency_codes.setdefault(code, len(currency_codes)))
+
+    return {
+        'purchase_price': np.frombuffer(prices, dtype=np.float64),
+        'co2_emissions': np.frombuffer(co2, dtype=np.int32),
+        'vehicle_age_years': np.frombuffer(ages, dtype=np.int16),
+        'fuel_type': np.frombuffer(fuel, dtype=np.int8),
+        'transport_method': np.frombuffer(transport, dtype=np.int8),
+        'import_origin': np.frombuffer(origin, dtype=np.int8),
+        'source_currency': np.frombuffer(currency, dtype=np.int16),
+        'currencies': np.array(list(currency_codes), dtype=object)
+    }
+
+
+def fleet_exchange_rates(fleet: Dict[str, np.ndarray], exchange_rate: float, snapshot=None) -> np.ndarray:
+    """
+    Per-vehicle rate to EUR for a fleet from read_fleet_columns()
+    exchange_rate is the GBP rate; other currencies use the rate snapshot (fetched
+    only if the fleet has any), as fleet_analytics.aggregate_fleet does. Raises
+    ValueError for a currency the snapshot doesn't have
+    """
+    currencies = fleet['currencies']
+    snapshot = _fleet_snapshot(fleet, snapshot)
+    rates = np.array([exchange_rate if currency == 'GBP' else snapshot.rate(currency, 'EUR')
+                      for currency in currencies], dtype=np.float64)
+    return rates[fleet['source_currency']]
+
+
+def fleet_gbp_prices(fleet: Dict[str, np.ndarray], snapshot=None) -> np.ndarray:
+    """
+    Purchase prices converted to GBP, as the web calculator reports uk_price_gbp
+    GBP rows are kept as given; other currencies are converted with the snapshot
+    and rounded to the penny
+    """
+    currencies = fleet['currencies']
+    snapshot = _fleet_snapshot(fleet, snapshot)
+    to_gbp = np.array([1.0 if currency == 'GBP' else snapshot.rate(currency, 'GBP')
+                       for currency in currencies], dtype=np.float64)
+    prices = fleet['purchase_price']
+    return np.where(fleet['source_currency'] == 0, prices,
+                    (prices * to_gbp[fleet['source_currency']]).round(2))
+
+
+def _fleet_snapshot(fleet: Dict[str, np.ndarray], snapshot):
+    """The given rate snapshot, or the cached one if the fleet has non-GBP rows"""
+    if len(fleet['currencies']) > 1 and snapshot is None:
+        from exchange_rates import get_rate_snapshot
+        snapshot = get_rate_snapshot()
+    return snapshot
+
+
+def calculate_fleet_file(co2_bands, source, exchange_rate: float, snapshot=None) -> Dict[str, np.ndarray]:
+    """
+    Read and price a fleet CSV (path or open text file) in one vectorised pass
+    exchange_rate is the GBP rate (see fleet_exchange_rates). The result also carries
+    each vehicle's purchase_price and source_currency, with uk_price_gbp converted
+    to GBP as in the web calculator's results
+    """
+    fleet = read_fleet_columns(source)
+    result = calculate_batch(co2_bands, fleet['purchase_price'], fleet['co2_emissions'],
+                             fleet_exchange_rates(fleet, exchange_rate, snapshot),
+                             fleet['fuel_type'], fleet['vehicle_age_years'],
+                             fleet['transport_method'], fleet['import_origin'])
+    result['uk_price_gbp'] = fleet_gbp_prices(fleet, snapshot)
+    result['purchase_price'] = fleet['purchase_price']
+    result['source_currency'] = fleet['currencies'][fleet['source_currency']]
+    return result
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Measure template compile and render times for the VRT Calculator
+Compares compiling with and without the Jinja bytecode cache, and rendering
+results.html directly versus through the rendered-page cache
+"""
+
+import tempfile
+import time
+
+from flask import render_template
+from jinja2 import Environment, FileSystemBytecodeCache
+
+from app import app, calculator, render_results_page, results_page_cache
+from warmup import TEMPLATES
+
+
+def time_compile(bytecode_cache=None, repeat=5):
+    """Average time for a fresh environment (as in a new worker) to load every template"""
+    total = 0.0
+    for _ in range(repeat):
+        env = Environment(loader=app.jinja_env.loader, bytecode_cache=bytecode_cache)
+        env.globals.update(app.jinja_env.globals)
+        start = time.perf_counter()
+        for name in TEMPLATES:
+            env.get_template(name)
+        total += time.perf_counter() - start
+    return total / repeat
+
+
+def time_render(render, result, repeat=500):
+    """Average time per results page render"""
+    with app.test_request_context('/calculate', method='POST'):
+        render(result)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            render(result)
+        return (time.perf_counter() - start) / repeat
+
+
+def main():
+    print("Template benchmark")
+    print("=" * 50)
+
+    no_cache = time_compile()
+    with tempfile.TemporaryDirectory() as cache_dir:
+        bytecode_cache = FileSystemBytecodeCache(cache_dir)
+        time_compile(bytecode_cache, repeat=1)  # populate the cache
+        with_cache = time_compile(bytecode_cache)
+    print(f"Compile {len(TEMPLATES)} templates (no bytecode cache):   {no_cache * 1000:8.2f} ms")
+    print(f"Compile {len(TEMPLATES)} templates (with bytecode cache): {with_cache * 1000:8.2f} ms")
+
+    result = calculator.calculate_comprehensive_costs(15000, 150, 'petrol', 3, 'ferry', 'uk',
+                                                      exchange_rate=1.17)
+    direct = time_render(lambda r: render_template('results.html', result=r), result)
+    results_page_cache.clear()
+    cached = time_render(render_results_page, result)
+    print(f"Render results.html (direct):      {direct * 1000:8.3f} ms")
+    print(f"Render results.html (page cache):  {cached * 1000:8.3f} ms")
+    print(f"Page cache: {results_page_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
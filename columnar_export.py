@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Columnar export of VRT calculation results
+Writes batch and history results as typed, flattened columns in Arrow IPC
+(memory-mappable) or Parquet format for dataframe tools
+"""
+
+import argparse
+import os
+import sys
+from array import array
+from datetime import datetime
+from typing import Dict, Iterable
+
+import numpy as np
+
+from batch_calculator import CATEGORIES, COLUMNS, calculate_fleet_file
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Export needs pyarrow; the rest of the app doesn't
+    pa = None
+    pq = None
+
+FORMATS = ('ipc', 'parquet')
+
+# Where each flattened column lives in a calculate_comprehensive_costs result
+RESULT_PATHS = {
+    'uk_price_gbp': ('purchase_details', 'uk_price_gbp'),
+    'purchase_price': ('purchase_details', 'purchase_price'),
+    'source_currency': ('purchase_details', 'source_currency'),
+    'exchange_rate': ('purchase_details', 'exchange_rate'),
+    'vehicle_value_eur': ('purchase_details', 'vehicle_value_eur'),
+    'import_origin': ('purchase_details', 'import_origin'),
+    'fuel_type': ('purchase_details', 'fuel_type'),
+    'vehicle_age_years': ('purchase_details', 'vehicle_age_years'),
+    'transport_method': ('purchase_details', 'transport_method'),
+    'co2_emissions': ('vrt_calculation', 'co2_emissions'),
+    'co2_rate_percent': ('vrt_calculation', 'co2_rate_percent'),
+    'transport': ('transport_costs', 'transport'),
+    'insurance': ('transport_costs', 'insurance'),
+    'customs_clearance': ('transport_costs', 'customs_clearance'),
+    'transport_total': ('transport_costs', 'total'),
+    'omv': ('omv',),
+    'customs_duty': ('customs_duty',),
+    'base_vrt': ('vrt_calculation', 'base_vrt'),
+    'minimum_vrt': ('vrt_calculation', 'minimum_vrt'),
+    'final_vrt': ('vrt_calculation', 'final_vrt'),
+    'vat_base': ('vat_calculation', 'vat_base'),
+    'vat_amount': ('vat_calculation', 'vat_amount'),
+    'motor_tax_annual': ('additional_costs', 'motor_tax_annual'),
+    'nct_test': ('additional_costs', 'nct_test'),
+    'registration_fee': ('additional_costs', 'registration_fee'),
+    'total_import_cost': ('total_import_cost',),
+}
+
+# Columns kept as strings (object arrays) rather than numeric buffers
+STRING_COLUMNS = ('source_currency',)
+
+# Array typecodes for the non-float columns (everything else is float64)
+INTEGER_COLUMNS = {
+    'import_origin': 'b', 'fuel_type': 'b', 'transport_method': 'b',
+    'vehicle_age_years': 'h', 'co2_emissions': 'i',
+    'motor_tax_annual': 'h', 'nct_test': 'h', 'registration_fee': 'h'
+}
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("Columnar export needs pyarrow: pip3 install pyarrow")
+
+
+def columns_to_table(columns: Dict[str, np.ndarray]) -> 'pa.Table':
+    """
+    Wrap result columns in an Arrow table
+    Numeric NumPy columns are handed to Arrow without copying; categorical code
+    columns become dictionary-encoded strings
+    """
+    _require_pyarrow()
+    names, arrays = [], []
+    for name in list(COLUMNS) + [n for n in columns if n not in COLUMNS]:
+        if name not in columns:
+            continue
+        values = columns[name]
+        if name in CATEGORIES:
+            arrays.append(pa.DictionaryArray.from_arrays(
+                pa.array(values, type=pa.int8()), pa.array(CATEGORIES[name], type=pa.string())))
+        elif name == 'calculation_date':
+            arrays.append(pa.array(values.astype('datetime64[us]')))
+        else:
+            arrays.append(pa.array(values))
+        names.append(name)
+    return pa.Table.from_arrays(arrays, names=names)
+
+
+def write_arrow_ipc(columns: Dict[str, np.ndarray], path: str):
+    """Write an Arrow IPC file, which readers can open with read_arrow_ipc() without loading it"""
+    table = columns_to_table(columns)
+    with pa.OSFile(path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=64 * 1024)
+
+
+def write_parquet(columns: Dict[str, np.ndarray], path: str, compression: str = 'zstd'):
+    pq.write_table(columns_to_table(columns), path, compression=compression)
+
+
+def read_arrow_ipc(path: str) -> 'pa.Table':
+    """Open an Arrow IPC export memory-mapped (columns are read lazily from the page cache)"""
+    _require_pyarrow()
+    return pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+
+
+def write_columns(columns: Dict[str, np.ndarray], path: str, fmt: str):
+    if fmt == 'ipc':
+        write_arrow_ipc(columns, path)
+    elif fmt == 'parquet':
+        write_parquet(columns, path)
+    else:
+        raise ValueError(f"Unknown format {fmt!r} - expected one of {FORMATS}")
+
+
+def history_to_columns(records: Iterable[Dict]) -> Dict[str, np.ndarray]:
+    """
+    Flatten stored web calculation results into typed columns
+    Results stored before purchases could be priced in other currencies are
+    reported as GBP purchases of uk_price_gbp
+    """
+    buffers = {name: [] if name in STRING_COLUMNS else array(INTEGER_COLUMNS.get(name, 'd'))
+               for name in RESULT_PATHS}
+    defaults = {'source_currency': 'GBP'}
+    dates = []
+    codes = {name: {value: code for code, value in enumerate(categories)}
+             for name, categories in CATEGORIES.items()}
+
+    for record in records:
+        # Only results from calculate_comprehensive_costs have the nested layout
+        if 'vrt_calculation' not in record:
+            continue
+        for name, path in RESULT_PATHS.items():
+            value = record
+            for key in path:
+                value = value.get(key) if isinstance(value, dict) else None
+            if name == 'purchase_price' and value is None:
+                value = record.get('purchase_details', {}).get('uk_price_gbp')
+            if name in codes:
+                categories = codes[name]
+                value = categories.get(str(value or '').lower(), 0 if value is None else len(categories) - 1)
+            buffers[name].append(value if value is not None else defaults.get(name, 0))
+        dates.append(record['calculation_date'])
+
+    columns = {name: np.array(buffer, dtype=object) if name in STRING_COLUMNS
+               else np.frombuffer(buffer, dtype=buffer.typecode)
+               for name, buffer in buffers.items()}
+    # Stored dates are naive local ISO strings; keep the wall-clock value as written
+    columns['calculation_date'] = np.array(dates, dtype='datetime64[us]')
+    return columns
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export VRT results as Arrow IPC or Parquet")
+    sub = parser.add_subparsers(dest='source', required=True)
+
+    fleet = sub.add_parser('fleet', help="Price a fleet CSV and export the results")
+    fleet.add_argument('fleet_csv')
+    fleet.add_argument('--exchange-rate', type=float,
+                       help="GBP to EUR rate (default: current rate); other source currencies use current rates")
+
+    history = sub.add_parser('history', help="Export stored calculation history")
+    history.add_argument('--path', help="History log file")
+    history.add_argument('--since', help="ISO date/time")
+    history.add_argument('--until', help="ISO date/time")
+
+    for command in (fleet, history):
+        command.add_argument('output')
+        command.add_argument('--format', choices=FORMATS,
+                             help="Output format (default: from the file extension, else ipc)")
+
+    args = parser.parse_args()
+    fmt = args.format or ('parquet' if args.output.endswith('.parquet') else 'ipc')
+
+    if args.source == 'fleet':
+        from app import VRTCalculatorWeb
+        calculator = VRTCalculatorWeb()
+        exchange_rate = args.exchange_rate or calculator.get_current_exchange_rate()
+        try:
+            columns = calculate_fleet_file(calculator.co2_bands, args.fleet_csv, exchange_rate,
+                                           calculator.get_rate_snapshot())
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+    else:
+        from history_store import DEFAULT_HISTORY_PATH, HistoryStore
+        store = HistoryStore(args.path or DEFAULT_HISTORY_PATH)
+        records = store.query(
+            since=datetime.fromisoformat(args.since).timestamp() if args.since else None,
+            until=datetime.fromisoformat(args.until).timestamp() if args.until else None,
+            newest_first=False
+        )
+        columns = history_to_columns(records)
+
+    try:
+        write_columns(columns, args.output, fmt)
+    except ImportError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    rows = len(next(iter(columns.values()))) if columns else 0
+    print(f"Wrote {rows:,} rows ({os.path.getsize(args.output):,} bytes) to {args.output} [{fmt}]")
+
+
+if __name__ == "__main__":
+    main()
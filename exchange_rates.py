@@ -0,0 +1,116 @@
+"""
+Exchange rate snapshots for the VRT calculator
+One fetch of the GBP rate table is kept as a compact snapshot so any
+currency pair can be converted without another API call
+"""
+
+import os
+import threading
+import time
+from array import array
+from datetime import datetime
+from typing import Dict, Optional
+
+import requests
+
+import vrt_core
+
+RATES_URL = "https://api.exchangerate-api.com/v4/latest/GBP"
+
+# How long a fetched snapshot is reused before refreshing (seconds)
+CACHE_TTL_SECONDS = int(os.environ.get('RATE_CACHE_TTL', 3600))
+
+
+class RateSnapshot:
+    """
+    Immutable table of rates against a single base currency
+    Rates are stored in a flat array with a currency -> slot index, so a
+    cross rate between any two currencies is two lookups and a division
+    """
+
+    __slots__ = ('base', 'fetched_at', 'is_fallback', '_index', '_rates')
+
+    def __init__(self, base: str, rates: Dict[str, float],
+                 fetched_at: Optional[datetime] = None, is_fallback: bool = False):
+        self.base = base.upper()
+        self.fetched_at = fetched_at or datetime.now()
+        self.is_fallback = is_fallback
+        rates = {code.upper(): float(rate) for code, rate in rates.items()}
+        rates[self.base] = 1.0
+        self._index = {code: slot for slot, code in enumerate(rates)}
+        self._rates = array('d', rates.values())
+
+    @property
+    def currencies(self):
+        return list(self._index)
+
+    def __contains__(self, currency: str) -> bool:
+        return currency.upper() in self._index
+
+    def rate(self, from_currency: str, to_currency: str = 'EUR') -> float:
+        """Units of to_currency per one unit of from_currency"""
+        try:
+            from_rate = self._rates[self._index[from_currency.upper()]]
+            to_rate = self._rates[self._index[to_currency.upper()]]
+        except KeyError as e:
+            raise ValueError(f"Unsupported currency: {e.args[0]}") from None
+        return to_rate / from_rate
+
+    def convert(self, amount: float, from_currency: str, to_currency: str = 'EUR') -> float:
+        """Convert an amount between two currencies"""
+        return amount * self.rate(from_currency, to_currency)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'RateSnapshot':
+        """Rebuild a snapshot written with to_dict()"""
+        return cls(data['base'], data['rates'], datetime.fromisoformat(data['fetched_at']),
+                   data.get('is_fallback', False))
+
+    def to_dict(self) -> Dict:
+        return {
+            'base': self.base,
+            'rates': {code: self._rates[slot] for code, slot in self._index.items()},
+            'fetched_at': self.fetched_at.isoformat(),
+            'is_fallback': self.is_fallback
+        }
+
+
+def fallback_snapshot() -> RateSnapshot:
+    """Snapshot used when the rate API is unavailable"""
+    return RateSnapshot('GBP', {'EUR': vrt_core.FALLBACK_EXCHANGE_RATE}, is_fallback=True)
+
+
+def fetch_rate_snapshot() -> RateSnapshot:
+    """Download the full GBP rate table - falls back to a GBP/EUR-only snapshot"""
+    try:
+        response = requests.get(RATES_URL, timeout=10)
+        if response.status_code == 200:
+            data = response.json()
+            return RateSnapshot(data.get('base', 'GBP'), data['rates'])
+    except Exception:
+        pass
+
+    return fallback_snapshot()
+
+
+_cached_snapshot = None
+_cached_at = 0.0
+_cache_lock = threading.Lock()
+
+
+def get_rate_snapshot(force_refresh: bool = False, max_age: Optional[float] = None) -> RateSnapshot:
+    """
+    Get the cached rate snapshot, fetching a new one once the TTL has expired
+    max_age (seconds) replaces the TTL for callers that need a fresher snapshot
+    """
+    global _cached_snapshot, _cached_at
+
+    with _cache_lock:
+        expired = time.monotonic() - _cached_at > (CACHE_TTL_SECONDS if max_age is None else max_age)
+        # Retry fallback snapshots sooner so an API outage doesn't stick for an hour
+        if _cached_snapshot is not None and _cached_snapshot.is_fallback:
+            expired = time.monotonic() - _cached_at > 60
+        if force_refresh or _cached_snapshot is None or expired:
+            _cached_snapshot = fetch_rate_snapshot()
+            _cached_at = time.monotonic()
+        return _cached_snapshot
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Fleet portfolio analytics for VRT import costs
+Streams a fleet file through the web calculator in a single pass with constant memory
+"""
+
+import argparse
+import csv
+import json
+import math
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import vrt_core
+from alloc_profiler import profiler
+from app import VRTCalculatorWeb
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with bounded relative error (DDSketch-style)
+    Values are counted in logarithmic buckets, so memory depends only on the
+    range of values seen - not on how many there are
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value: float):
+        """Add a single value to the sketch"""
+        self.count += 1
+        if value <= 0:
+            self.zero_count += 1
+            return
+        key = math.ceil(math.log(value) / self.log_gamma)
+        self.buckets[key] = self.buckets.get(key, 0) + 1
+
+    def merge(self, other: 'QuantileSketch'):
+        """Merge another sketch (built with the same accuracy) into this one"""
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate value at quantile q (0-1)"""
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+    def to_dict(self) -> Dict:
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'buckets': {str(k): v for k, v in self.buckets.items()},
+            'zero_count': self.zero_count,
+            'count': self.count
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'QuantileSketch':
+        sketch = cls(data['relative_accuracy'])
+        sketch.buckets = {int(k): v for k, v in data['buckets'].items()}
+        sketch.zero_count = data['zero_count']
+        sketch.count = data['count']
+        return sketch
+
+
+class FleetAggregate:
+    """
+    Running totals for a fleet of import calculations
+    Partial aggregates (e.g. from parallel workers) can be combined with merge()
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.vehicle_count = 0
+        self.total_landed_cost = 0.0
+        self.total_vehicle_value = 0.0
+        self.total_vrt = 0.0
+        self.total_vat = 0.0
+        self.customs_duty_paid = 0.0
+        self.uk_origin_count = 0
+        self.ni_origin_count = 0
+        self.ni_origin_savings = 0.0
+        # Band label -> [vehicle count, VRT collected]
+        self.vrt_by_band: Dict[str, List[float]] = {}
+        self.cost_sketch = QuantileSketch(relative_accuracy)
+
+    def add(self, result: Dict, band_label: str):
+        """Add one calculate_comprehensive_costs result to the aggregate"""
+        vehicle_value = result['purchase_details']['vehicle_value_eur']
+        final_vrt = result['vrt_calculation']['final_vrt']
+        total = result['total_import_cost']
+
+        self.vehicle_count += 1
+        self.total_landed_cost += total
+        self.total_vehicle_value += vehicle_value
+        self.total_vrt += final_vrt
+        self.total_vat += result['vat_calculation']['vat_amount']
+
+        if result['customs_duty_applicable']:
+            self.uk_origin_count += 1
+            self.customs_duty_paid += result['customs_duty']
+        else:
+            # Duty avoided plus the VAT that would have been charged on it
+            self.ni_origin_count += 1
+            self.ni_origin_savings += vehicle_value * vrt_core.CUSTOMS_DUTY_RATE * (1 + vrt_core.VAT_RATE)
+
+        band = self.vrt_by_band.setdefault(band_label, [0, 0.0])
+        band[0] += 1
+        band[1] += final_vrt
+
+        self.cost_sketch.add(total)
+
+    def merge(self, other: 'FleetAggregate'):
+        """Merge a partial aggregate into this one"""
+        self.vehicle_count += other.vehicle_count
+        self.total_landed_cost += other.total_landed_cost
+        self.total_vehicle_value += other.total_vehicle_value
+        self.total_vrt += other.total_vrt
+        self.total_vat += other.total_vat
+        self.customs_duty_paid += other.customs_duty_paid
+        self.uk_origin_count += other.uk_origin_count
+        self.ni_origin_count += other.ni_origin_count
+        self.ni_origin_savings += other.ni_origin_savings
+        for label, (count, vrt) in other.vrt_by_band.items():
+            band = self.vrt_by_band.setdefault(label, [0, 0.0])
+            band[0] += count
+            band[1] += vrt
+        self.cost_sketch.merge(other.cost_sketch)
+        return self
+
+    def summary(self, percentiles=(5, 25, 50, 75, 95, 99)) -> Dict:
+        """Summary analytics for the fleet"""
+        count = self.vehicle_count
+        return {
+            'vehicle_count': count,
+            'total_landed_cost': round(self.total_landed_cost, 2),
+            'average_landed_cost': round(self.total_landed_cost / count, 2) if count else 0,
+            'total_vehicle_value_eur': round(self.total_vehicle_value, 2),
+            'total_vrt': round(self.total_vrt, 2),
+            'total_vat': round(self.total_vat, 2),
+            'vrt_by_co2_band': {
+                label: {'vehicles': int(band_count), 'vrt': round(vrt, 2)}
+                for label, (band_count, vrt) in sorted(
+                    self.vrt_by_band.items(), key=lambda item: int(item[0].split('-')[0].rstrip('+')))
+            },
+            'customs_duty': {
+                'uk_origin_vehicles': self.uk_origin_count,
+                'duty_paid': round(self.customs_duty_paid, 2),
+                'ni_origin_vehicles': self.ni_origin_count,
+                'ni_origin_savings': round(self.ni_origin_savings, 2)
+            },
+            'cost_percentiles': {
+                f'p{p}': round(self.cost_sketch.quantile(p / 100), 2) if count else None
+                for p in percentiles
+            },
+            'percentile_relative_accuracy': self.cost_sketch.relative_accuracy
+        }
+
+    def to_dict(self) -> Dict:
+        """Serializable form for shipping partial aggregates between processes"""
+        state = {k: v for k, v in self.__dict__.items() if k != 'cost_sketch'}
+        state['cost_sketch'] = self.cost_sketch.to_dict()
+        return state
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'FleetAggregate':
+        aggregate = cls()
+        for key, value in data.items():
+            if key != 'cost_sketch':
+                setattr(aggregate, key, value)
+        aggregate.cost_sketch = QuantileSketch.from_dict(data['cost_sketch'])
+        return aggregate
+
+
+def iter_fleet_csv(path: str) -> Iterator[Dict]:
+    """
+    Stream vehicles from a CSV fleet file
+    Columns match the calculator form: uk_price, co2_emissions, fuel_type,
+    vehicle_age, transport_method, import_origin and optional source_currency
+    """
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            yield row
+
+
+def aggregate_fleet(vehicles: Iterable[Dict],
+                    calculator: Optional[VRTCalculatorWeb] = None,
+                    exchange_rate: Optional[float] = None) -> FleetAggregate:
+    """Aggregate a stream of vehicles in a single pass"""
+    calculator = calculator or VRTCalculatorWeb()
+    if exchange_rate is None:
+        exchange_rate = calculator.get_current_exchange_rate()
+
+    snapshot = calculator.get_rate_snapshot()
+
+    aggregate = FleetAggregate()
+    for vehicle in vehicles:
+        with profiler.track('fleet_row'):
+            co2_emissions = int(vehicle['co2_emissions'])
+            source_currency = (vehicle.get('source_currency') or 'GBP').upper()
+            # The exchange_rate override is a GBP rate; other currencies come from the snapshot
+            if source_currency == 'GBP':
+                rate = exchange_rate
+            else:
+                rate = snapshot.rate(source_currency, 'EUR')
+            result = calculator.calculate_comprehensive_costs(
+                float(vehicle['uk_price']),
+                co2_emissions,
+                vehicle.get('fuel_type') or 'petrol',
+                int(vehicle.get('vehicle_age') or 0),
+                vehicle.get('transport_method') or 'ferry',
+                vehicle.get('import_origin') or 'uk',
+                exchange_rate=rate,
+                source_currency=source_currency
+            )
+            aggregate.add(result, calculator.get_co2_band_label(co2_emissions))
+    return aggregate
+
+
+def _aggregate_chunk(rows: List[Dict], exchange_rate: float) -> Dict:
+    """Worker entry point - returns a serialized partial aggregate"""
+    return aggregate_fleet(rows, exchange_rate=exchange_rate).to_dict()
+
+
+def aggregate_fleet_parallel(vehicles: Iterable[Dict], workers: int,
+                             exchange_rate: float, chunk_size: int = 5000) -> FleetAggregate:
+    """Aggregate in parallel chunks, keeping at most 2 chunks per worker in flight"""
+    total = FleetAggregate()
+    vehicles = iter(vehicles)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        while True:
+            chunk = list(islice(vehicles, chunk_size))
+            if chunk:
+                pending.append(pool.submit(_aggregate_chunk, chunk, exchange_rate))
+            if pending and (not chunk or len(pending) >= workers * 2):
+                total.merge(FleetAggregate.from_dict(pending.pop(0).result()))
+            if not chunk and not pending:
+                break
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fleet import cost analytics")
+    parser.add_argument('fleet_csv', help="CSV file with one vehicle per row")
+    parser.add_argument('--workers', type=int, default=1, help="Number of worker processes")
+    parser.add_argument('--exchange-rate', type=float, help="GBP to EUR rate (default: fetch current rate)")
+    args = parser.parse_args()
+
+    exchange_rate = args.exchange_rate or VRTCalculatorWeb().get_current_exchange_rate()
+    vehicles = iter_fleet_csv(args.fleet_csv)
+
+    try:
+        if args.workers > 1:
+            aggregate = aggregate_fleet_parallel(vehicles, args.workers, exchange_rate)
+        else:
+            aggregate = aggregate_fleet(vehicles, exchange_rate=exchange_rate)
+    except (KeyError, ValueError) as e:
+        print(f"Error: Invalid fleet file - {e}")
+        sys.exit(1)
+
+    print(json.dumps(aggregate.summary(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
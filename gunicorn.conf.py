@@ -0,0 +1,40 @@
+"""
+Gunicorn configuration for the VRT Calculator
+Usage: gunicorn --config gunicorn.conf.py app:app
+"""
+
+import os
+
+try:
+    import gevent
+except ImportError:  # Without gevent, rate streams fall back to long-polling on sync workers
+    gevent = None
+
+bind = f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', 8000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 4))
+
+# gevent workers hold thousands of open rate streams per process as greenlets
+worker_class = os.environ.get('WORKER_CLASS', 'gevent' if gevent is not None else 'sync')
+worker_connections = int(os.environ.get('WORKER_CONNECTIONS', 2000))
+
+if worker_class == 'gevent':
+    # Patch before the app is preloaded so its locks and sockets are cooperative
+    from gevent import monkey
+    monkey.patch_all()
+
+# Load the app in the master so warmed structures are shared copy-on-write
+preload_app = True
+
+
+def when_ready(server):
+    """Runs in the master after the app is loaded and before workers are forked"""
+    from warmup import warmup
+
+    timings = warmup()
+    summary = ', '.join(f"{phase} {seconds * 1000:.1f}ms" for phase, seconds in timings.items())
+    server.log.info(f"Warmup complete: {summary}")
+
+    # One upstream rate refresher for all workers, shared through RATE_SNAPSHOT_PATH
+    from rate_stream import start_shared_refresher
+
+    start_shared_refresher()
@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+"""
+Append-only calculation history for the VRT calculator
+Results are appended as JSON lines to a single log file, with a fixed-width
+sidecar index (time, CO2 band, origin, fuel, currency) for last-N and range queries
+"""
+
+import argparse
+import atexit
+import fcntl
+import glob
+import json
+import os
+import struct
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from contextlib import ExitStack, contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+DEFAULT_HISTORY_PATH = os.environ.get('VRT_HISTORY_PATH', 'vrt_history.jsonl')
+
+# Index entry: log offset, record length, timestamp, CO2 emissions, origin, fuel,
+# source currency (ISO code). Entries changed size when the currency was added, so
+# the index moved to a new file name; a missing index is rebuilt from the log
+INDEX_ENTRY = struct.Struct('<QIdHBB3s')
+INDEX_SUFFIX = '.v2.idx'
+
+ORIGINS = ('uk', 'ni')
+FUEL_TYPES = ('petrol', 'diesel', 'hybrid', 'electric', 'other')
+
+FSYNC_POLICIES = ('always', 'batch', 'never')
+
+# Longest a buffered record waits before it is written, so other processes (and
+# `history_store.py last`) see quiet workers' results too (seconds, 0 disables)
+DEFAULT_FLUSH_INTERVAL = float(os.environ.get('VRT_HISTORY_FLUSH_INTERVAL', 5))
+
+
+class IndexEntry:
+    __slots__ = ('offset', 'length', 'timestamp', 'co2_emissions', 'origin', 'fuel', 'currency')
+
+    def __init__(self, offset, length, timestamp, co2_emissions, origin, fuel, currency):
+        self.offset = offset
+        self.length = length
+        self.timestamp = timestamp
+        self.co2_emissions = co2_emissions
+        self.origin = origin
+        self.fuel = fuel
+        self.currency = currency
+
+
+def _fuel_code(fuel_type: Optional[str]) -> int:
+    fuel_type = (fuel_type or '').lower()
+    return FUEL_TYPES.index(fuel_type) if fuel_type in FUEL_TYPES else FUEL_TYPES.index('other')
+
+
+def _record_fields(result: Dict):
+    """Indexed fields for a calculate_comprehensive_costs (or CLI) result"""
+    vrt = result.get('vrt_calculation', result)
+    co2_emissions = int(vrt.get('co2_emissions', 0))
+    # Basic CLI results keep import_origin at the top level
+    origin = (result.get('purchase_details', {}).get('import_origin') or
+              result.get('import_origin') or 'uk').lower()
+    fuel_type = result.get('purchase_details', {}).get('fuel_type') or result.get('fuel_type')
+    # CLI results have no source_currency - they are always priced from GBP
+    currency = result.get('purchase_details', {}).get('source_currency') or result.get('source_currency') or 'GBP'
+    return (co2_emissions, ORIGINS.index(origin) if origin in ORIGINS else 0, _fuel_code(fuel_type),
+            currency_code(currency))
+
+
+def currency_code(currency: str) -> bytes:
+    """Source currency as stored in the index"""
+    return currency.strip().upper().encode('ascii', 'replace')[:3]
+
+
+def _timestamp(result: Dict) -> float:
+    try:
+        return datetime.fromisoformat(result['calculation_date']).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return time.time()
+
+
+class HistoryStore:
+    """
+    Append-only history log with a sidecar index
+    Records are buffered and written in batches, or once the oldest has waited
+    flush_interval seconds; fsync controls durability: 'always' syncs every flush,
+    'batch' syncs when the buffer fills, 'never' leaves it to the OS
+    """
+
+    def __init__(self, path: str = DEFAULT_HISTORY_PATH, batch_size: int = 50,
+                 fsync: str = 'batch', flush_interval: float = DEFAULT_FLUSH_INTERVAL):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}")
+        self.path = path
+        self.index_path = path + INDEX_SUFFIX
+        self.lock_path = path + '.lock'
+        self.batch_size = batch_size
+        self.fsync = fsync
+        self.flush_interval = flush_interval
+        self._buffer: List[Dict] = []
+        self._flush_timer: Optional[threading.Timer] = None
+        self._entries: List[IndexEntry] = []
+        self._timestamps: List[float] = []
+        self._in_time_order = True
+        self._index_size = 0
+        self._index_inode = None
+        self._lock = threading.Lock()
+        self._rebuild_missing_index()
+        atexit.register(self.flush)
+
+    # Writing
+
+    def append(self, result: Dict):
+        """Queue a result - written once batch_size records are buffered or flush_interval seconds pass"""
+        with self._lock:
+            self._buffer.append(result)
+            if len(self._buffer) >= self.batch_size:
+                self._flush_locked(sync=self.fsync != 'never')
+            elif len(self._buffer) == 1 and self.flush_interval > 0:
+                self._flush_timer = threading.Timer(self.flush_interval, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def flush(self):
+        """Write any buffered records"""
+        with self._lock:
+            self._flush_locked(sync=self.fsync == 'always')
+
+    def _flush_locked(self, sync: bool):
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        if not self._buffer:
+            return
+        lines = [json.dumps(result, separators=(',', ':')).encode('utf-8') + b'\n'
+                 for result in self._buffer]
+
+        with self._file_lock(fcntl.LOCK_SH):
+            log_fd = self._open_locked_log()
+            index_fd = os.open(self.index_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                offset = os.fstat(log_fd).st_size
+                index_bytes = bytearray()
+                for result, line in zip(self._buffer, lines):
+                    co2_emissions, origin, fuel, currency = _record_fields(result)
+                    index_bytes += INDEX_ENTRY.pack(offset, len(line), _timestamp(result),
+                                                    min(co2_emissions, 0xFFFF), origin, fuel, currency)
+                    offset += len(line)
+                os.write(log_fd, b''.join(lines))
+                os.write(index_fd, bytes(index_bytes))
+                if sync:
+                    os.fsync(log_fd)
+                    os.fsync(index_fd)
+            finally:
+                fcntl.flock(log_fd, fcntl.LOCK_UN)
+                os.close(index_fd)
+                os.close(log_fd)
+        self._buffer = []
+
+    def _open_locked_log(self) -> int:
+        """
+        Open the log for appending under an exclusive lock
+        Several workers may share one store; the lock keeps log and index in step
+        """
+        while True:
+            log_fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            fcntl.flock(log_fd, fcntl.LOCK_EX)
+            # If compaction swapped the file while we waited, retry on the new one
+            try:
+                if os.fstat(log_fd).st_ino == os.stat(self.path).st_ino:
+                    return log_fd
+            except FileNotFoundError:
+                pass
+            fcntl.flock(log_fd, fcntl.LOCK_UN)
+            os.close(log_fd)
+
+    @contextmanager
+    def _file_lock(self, operation: int):
+        """
+        Lock on the store's .lock file, which compaction never replaces
+        Readers and writers hold it shared; compact() holds it exclusively while it
+        swaps the log and index, so nobody sees one file's new generation with the
+        other's old one
+        """
+        lock_fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(lock_fd, operation)
+            yield
+        finally:
+            fcntl.flock(lock_fd, fcntl.LOCK_UN)
+            os.close(lock_fd)
+
+    def read_lock(self):
+        """Hold while reading the index and then records from the log (see _file_lock)"""
+        return self._file_lock(fcntl.LOCK_SH)
+
+    # Reading
+
+    def _refresh_index(self):
+        """Load index entries appended since the last read (by this or other processes)"""
+        try:
+            stat = os.stat(self.index_path)
+        except OSError:
+            return
+        size = stat.st_size
+        if stat.st_ino != self._index_inode:
+            # Index was replaced by compaction - reload from scratch
+            self._reset_index()
+            self._index_inode = stat.st_ino
+        if size == self._index_size:
+            return
+        with open(self.index_path, 'rb') as f:
+            f.seek(self._index_size)
+            data = f.read(size - self._index_size)
+        usable = len(data) - len(data) % INDEX_ENTRY.size
+        for fields in INDEX_ENTRY.iter_unpack(data[:usable]):
+            if self._timestamps and fields[2] < self._timestamps[-1]:
+                # Concurrent writers can interleave batches; compaction restores order
+                self._in_time_order = False
+            self._entries.append(IndexEntry(*fields))
+            self._timestamps.append(fields[2])
+        self._index_size += usable
+
+    def _reset_index(self):
+        self._entries, self._timestamps, self._index_size = [], [], 0
+        self._in_time_order = True
+
+    def _band_range(self, co2_band: str):
+        """(min, max) CO2 for a band label such as '146-150' or '191+'"""
+        low, _, high = co2_band.rstrip('+').partition('-')
+        return int(low), int(high) if high else float('inf')
+
+    def _matches(self, entry: IndexEntry, co2_range, origin, fuel) -> bool:
+        if co2_range and not co2_range[0] <= entry.co2_emissions <= co2_range[1]:
+            return False
+        if origin is not None and entry.origin != origin:
+            return False
+        if fuel is not None and entry.fuel != fuel:
+            return False
+        return True
+
+    def _read(self, entries: List[IndexEntry]) -> Iterator[Dict]:
+        if not entries:
+            return
+        with open(self.path, 'rb') as f:
+            for entry in entries:
+                f.seek(entry.offset)
+                yield json.loads(f.read(entry.length))
+
+    def query(self, since: Optional[float] = None, until: Optional[float] = None,
+              co2_band: Optional[str] = None, origin: Optional[str] = None,
+              fuel_type: Optional[str] = None, limit: Optional[int] = None,
+              newest_first: bool = True) -> List[Dict]:
+        """Records in a time range (epoch seconds), optionally filtered by band, origin and fuel"""
+        with ExitStack() as reading:
+            with self._lock:
+                self._flush_locked(sync=self.fsync == 'always')
+                reading.enter_context(self.read_lock())
+                self._refresh_index()
+                candidates = self._candidates(since, until)
+
+            co2_range = self._band_range(co2_band) if co2_band else None
+            origin_code = ORIGINS.index(origin.lower()) if origin else None
+            fuel_code = _fuel_code(fuel_type) if fuel_type else None
+
+            ordered = reversed(candidates) if newest_first else iter(candidates)
+            selected = []
+            for entry in ordered:
+                if self._matches(entry, co2_range, origin_code, fuel_code):
+                    selected.append(entry)
+                    if limit is not None and len(selected) >= limit:
+                        break
+            return list(self._read(selected))
+
+    def _candidates(self, since: Optional[float], until: Optional[float]) -> List[IndexEntry]:
+        if self._in_time_order:
+            # Entries are appended in time order, so ranges are two bisections
+            start = bisect_left(self._timestamps, since) if since is not None else 0
+            end = bisect_right(self._timestamps, until) if until is not None else len(self._entries)
+            return self._entries[start:end]
+        return [e for e in self._entries
+                if (since is None or e.timestamp >= since) and
+                (until is None or e.timestamp <= until)]
+
+    def last(self, n: int = 10, **filters) -> List[Dict]:
+        """The n most recent records (newest first)"""
+        return self.query(limit=n, **filters)
+
+    def __len__(self):
+        with self._lock:
+            self._refresh_index()
+            return len(self._entries) + len(self._buffer)
+
+    # Maintenance
+
+    def compact(self, before: Optional[float] = None) -> int:
+        """
+        Rewrite the log and index, dropping records older than `before` (epoch seconds)
+        and putting records back in time order - returns the number of records kept
+        """
+        with self._lock:
+            self._flush_locked(sync=True)
+            with self._file_lock(fcntl.LOCK_EX):
+                return self._compact_locked(before)
+
+    def _compact_locked(self, before: Optional[float]) -> int:
+        lock_fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX)
+            self._reset_index()
+            self._refresh_index()
+            keep = [e for e in self._entries if before is None or e.timestamp >= before]
+            keep.sort(key=lambda e: e.timestamp)
+
+            tmp_log, tmp_index = self.path + '.compact', self.index_path + '.compact'
+            with open(self.path, 'rb') as src, open(tmp_log, 'wb') as log, open(tmp_index, 'wb') as index:
+                offset = 0
+                for entry in keep:
+                    src.seek(entry.offset)
+                    log.write(src.read(entry.length))
+                    index.write(INDEX_ENTRY.pack(offset, entry.length, entry.timestamp, entry.co2_emissions,
+                                                 entry.origin, entry.fuel, entry.currency))
+                    offset += entry.length
+                log.flush()
+                index.flush()
+                os.fsync(log.fileno())
+                os.fsync(index.fileno())
+            # Log first, then index, both under the exclusive store lock
+            os.replace(tmp_log, self.path)
+            os.replace(tmp_index, self.index_path)
+            self._reset_index()
+            self._refresh_index()
+            return len(keep)
+        finally:
+            fcntl.flock(lock_fd, fcntl.LOCK_UN)
+            os.close(lock_fd)
+
+    def _rebuild_missing_index(self):
+        """Write the index from the log if the log has records but there is no index (e.g. after an upgrade)"""
+        if os.path.exists(self.index_path) or not os.path.exists(self.path):
+            return
+        with self._file_lock(fcntl.LOCK_EX):
+            # Another process may have rebuilt it while we waited
+            if os.path.exists(self.index_path):
+                return
+            tmp_index = self.index_path + '.rebuild'
+            with open(self.path, 'rb') as log, open(tmp_index, 'wb') as index:
+                offset = 0
+                for line in log:
+                    try:
+                        result = json.loads(line) if line.endswith(b'\n') else None
+                    except ValueError:
+                        result = None
+                    # Skip blank, torn or corrupt lines - they were never indexed either
+                    if isinstance(result, dict):
+                        co2_emissions, origin, fuel, currency = _record_fields(result)
+                        index.write(INDEX_ENTRY.pack(offset, len(line), _timestamp(result),
+                                                     min(co2_emissions, 0xFFFF), origin, fuel, currency))
+                    offset += len(line)
+                index.flush()
+                os.fsync(index.fileno())
+            os.replace(tmp_index, self.index_path)
+
+    def import_json_files(self, pattern: str, remove: bool = False) -> int:
+        """Ingest legacy vrt_calculation_*.json / vrt_detailed_*.json files"""
+        files = sorted(glob.glob(pattern))
+        for filename in files:
+            with open(filename) as f:
+                self.append(json.load(f))
+        self.flush()
+        if remove:
+            for filename in files:
+                os.remove(filename)
+        return len(files)
+
+
+_default_store = None
+
+
+def get_history_store() -> HistoryStore:
+    """Process-wide store at VRT_HISTORY_PATH"""
+    global _default_store
+    if _default_store is None:
+        _default_store = HistoryStore(DEFAULT_HISTORY_PATH,
+                                      fsync=os.environ.get('VRT_HISTORY_FSYNC', 'batch'))
+    return _default_store
+
+
+def _parse_time(value: Optional[str]) -> Optional[float]:
+    return datetime.fromisoformat(value).timestamp() if value else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="VRT calculation history")
+    parser.add_argument('--path', default=DEFAULT_HISTORY_PATH, help="History log file")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    last = sub.add_parser('last', help="Show the most recent calculations")
+    last.add_argument('n', type=int, nargs='?', default=10)
+
+    query = sub.add_parser('range', help="Show calculations in a time range")
+    query.add_argument('--since', help="ISO date/time")
+    query.add_argument('--until', help="ISO date/time")
+    query.add_argument('--limit', type=int)
+
+    for command in (last, query):
+        command.add_argument('--band', help="CO2 band, e.g. 146-150 or 191+")
+        command.add_argument('--origin', choices=ORIGINS)
+        command.add_argument('--fuel', choices=FUEL_TYPES)
+
+    compact = sub.add_parser('compact', help="Rewrite the log, optionally dropping old records")
+    compact.add_argument('--before', help="Drop records older than this ISO date/time")
+
+    ingest = sub.add_parser('import', help="Import legacy per-calculation JSON files")
+    ingest.add_argument('pattern', help="Glob, e.g. 'audit/vrt_*.json'")
+    ingest.add_argument('--remove', action='store_true', help="Delete files once imported")
+
+    args = parser.parse_args()
+    store = HistoryStore(args.path, fsync='always')
+
+    if args.command == 'last':
+        records = store.last(args.n, co2_band=args.band, origin=args.origin, fuel_type=args.fuel)
+    elif args.command == 'range':
+        records = store.query(_parse_time(args.since), _parse_time(args.until), co2_band=args.band,
+                              origin=args.origin, fuel_type=args.fuel, limit=args.limit,
+                              newest_first=False)
+    elif args.command == 'compact':
+        kept = store.compact(_parse_time(args.before))
+        print(f"Compacted history: {kept} records kept")
+        return
+    else:
+        count = store.import_json_files(args.pattern, args.remove)
+        print(f"Imported {count} files into {args.path}")
+        return
+
+    for record in records:
+        print(json.dumps(record))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Monte Carlo landed-cost uncertainty for the VRT calculator
+Samples exchange rate movement, transport cost and transit insurance and
+prices every draw in one vectorised NumPy pass
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+
+from vrt_core import CUSTOMS_CLEARANCE, CUSTOMS_DUTY_RATE, REGISTRATION_FEE, VAT_RATE, depreciation_rate
+
+DEFAULT_DRAWS = 100_000
+MAX_DRAWS = 1_000_000
+
+# Annualised GBP/EUR volatility is roughly 6-8%; 3% covers the few weeks
+# between quoting and paying for an import
+DEFAULT_RATE_VOLATILITY = 0.03
+
+# Transport cost ranges in EUR (ferry crossings vary by route and vehicle size;
+# driving covers fuel, tolls and accommodation)
+TRANSPORT_COST_RANGES = {
+    'ferry': (200, 400),
+    'drive': (100, 250)
+}
+
+# Transit insurance is typically 1-2% of vehicle value
+INSURANCE_RATE_RANGE = (0.01, 0.02)
+
+PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+
+
+def simulate_landed_cost(purchase_price: float,
+                         exchange_rate: float,
+                         co2_rate: float,
+                         vrt_minimum: float,
+                         vehicle_age_years: int = 0,
+                         transport_method: str = 'ferry',
+                         import_origin: str = 'uk',
+                         draws: int = DEFAULT_DRAWS,
+                         rate_volatility: float = DEFAULT_RATE_VOLATILITY,
+                         bins: int = 20,
+                         seed: Optional[int] = None) -> Dict:
+    """
+    Distribution of total import cost for one vehicle
+    Mirrors vrt_core.calculate_costs for every draw
+    """
+    draws = int(min(max(draws, 1), MAX_DRAWS))
+    rng = np.random.default_rng(seed)
+
+    # Mean-preserving lognormal shock to the exchange rate
+    rates = exchange_rate * np.exp(
+        rng.normal(-0.5 * rate_volatility ** 2, rate_volatility, draws))
+    vehicle_value = purchase_price * rates
+
+    low, high = TRANSPORT_COST_RANGES.get(transport_method.lower(), TRANSPORT_COST_RANGES['drive'])
+    transport = rng.uniform(low, high, draws)
+    insurance = vehicle_value * rng.uniform(*INSURANCE_RATE_RANGE, draws)
+    transport_total = transport + insurance + CUSTOMS_CLEARANCE
+
+    omv = vehicle_value + transport_total
+    duty_rate = CUSTOMS_DUTY_RATE if import_origin.lower() == 'uk' else 0.0
+    customs_duty = vehicle_value * duty_rate
+
+    base_vrt = omv * (co2_rate / 100) * (1 - depreciation_rate(vehicle_age_years))
+    final_vrt = np.maximum(base_vrt, vrt_minimum)
+
+    vat_amount = (vehicle_value + customs_duty + final_vrt) * VAT_RATE
+    total = omv + customs_duty + final_vrt + vat_amount + REGISTRATION_FEE
+
+    counts, edges = np.histogram(total, bins=bins)
+    percentile_values = np.percentile(total, PERCENTILES)
+
+    return {
+        'draws': draws,
+        'mean': round(float(total.mean()), 2),
+        'std': round(float(total.std()), 2),
+        'min': round(float(total.min()), 2),
+        'max': round(float(total.max()), 2),
+        'percentiles': {f'p{p}': round(float(v), 2) for p, v in zip(PERCENTILES, percentile_values)},
+        'histogram': {
+            'bin_edges': [round(float(edge), 2) for edge in edges],
+            'counts': counts.tolist()
+        },
+        'assumptions': {
+            'exchange_rate': round(exchange_rate, 4),
+            'rate_volatility': rate_volatility,
+            'transport_cost_range': [low, high],
+            'insurance_rate_range': list(INSURANCE_RATE_RANGE)
+        }
+    }
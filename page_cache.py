@@ -0,0 +1,76 @@
+"""
+Caching for rendered pages
+A bounded LRU of rendered /calculate result pages plus a persistent Jinja
+bytecode cache so workers don't recompile templates at startup
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from jinja2 import FileSystemBytecodeCache
+
+# The results page shows the calculation date, which differs on every request.
+# Pages are rendered with this placeholder (19 characters, like the date slice
+# results.html shows, and free of the 'T' it replaces) and the real date is
+# substituted when the page is served
+CALCULATION_DATE_PLACEHOLDER = '#@#@#@#@#@#@#@#@#@#'
+
+
+def enable_bytecode_cache(flask_app, cache_dir: Optional[str] = None) -> str:
+    """Store compiled templates on disk so each worker loads bytecode instead of recompiling"""
+    cache_dir = cache_dir or os.environ.get(
+        'TEMPLATE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'vrt-calculator-jinja'))
+    os.makedirs(cache_dir, exist_ok=True)
+    flask_app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+    return cache_dir
+
+
+def result_cache_key(result: Dict, *versions) -> str:
+    """Hash of a computed result (minus its timestamp) and the tariff/rate versions"""
+    content = {k: v for k, v in result.items() if k != 'calculation_date'}
+    payload = json.dumps([content, versions], sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class RenderedPageCache:
+    """Thread-safe LRU of rendered pages"""
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            page = self._pages.get(key)
+            if page is None:
+                self.misses += 1
+                return None
+            self._pages.move_to_end(key)
+            self.hits += 1
+            return page
+
+    def put(self, key: str, page: str):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._pages[key] = page
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.maxsize:
+                self._pages.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'size': len(self._pages), 'maxsize': self.maxsize,
+                    'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Parity check for the VRT calculators
+Prices a seeded random corpus through every entry point - the shared core, the
+web calculator, both command line calculators, the batch engine and the app.js
+quick estimate (when node is installed) - and fails on any difference from the
+core. The core itself is checked against data/golden_costs.csv, so a formula
+change shows up as a golden-file diff. The web and enhanced calculators return
+the same result layout, so their purchase details (exchange rate rounding
+included) are compared field by field. Stored quotes repriced under a changed
+band table must match the core to the cent. Reports throughput per entry point.
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from typing import Callable, Dict, List
+
+import numpy as np
+
+import vrt_core
+from batch_calculator import FUEL_TYPES, ORIGINS, TRANSPORT_METHODS, calculate_batch, encode
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+GOLDEN_PATH = os.path.join(BASE_DIR, 'data', 'golden_costs.csv')
+GOLDEN_CASES = 1000
+GOLDEN_SEED = 2024
+
+# Results every entry point reports, compared to the cent
+FIELDS = ('customs_duty', 'final_vrt', 'vat_amount', 'total_import_cost')
+# Cases compared field by field between the web and enhanced calculators
+LAYOUT_CASES = 10_000
+# Cases stored and repriced under a changed band table
+REPRICING_CASES = 10_000
+INPUTS = ('uk_price_gbp', 'co2_emissions', 'exchange_rate', 'fuel_type',
+          'vehicle_age_years', 'transport_method', 'import_origin')
+
+# Runs app.js in a bare VM context with just enough DOM to load it, then prices
+# every case in the corpus file with quickEstimate()
+JS_RUNNER = r"""
+const fs = require('fs');
+const vm = require('vm');
+const [tariffPath, appPath, corpusPath] = process.argv.slice(-3);
+const context = vm.createContext({document: {addEventListener() {}}, console});
+vm.runInContext(fs.readFileSync(tariffPath, 'utf8'), context);
+vm.runInContext(fs.readFileSync(appPath, 'utf8'), context);
+context.corpus = JSON.parse(fs.readFileSync(corpusPath, 'utf8'));
+const output = vm.runInContext(`(() => {
+    const start = process.hrtime.bigint();
+    const results = corpus.map(c => quickEstimate(c[0], c[1], c[2], c[4], c[5], c[6]));
+    const seconds = Number(process.hrtime.bigint() - start) / 1e9;
+    return {seconds, results: results.map(r => [r.customsDuty, r.vrt, r.vat, r.total])};
+})()`, Object.assign(context, {process}));
+process.stdout.write(JSON.stringify(output));
+"""
+
+
+def generate_corpus(cases: int, seed: int) -> List[tuple]:
+    """Random vehicles covering every band, age, origin, fuel and transport method"""
+    rng = np.random.default_rng(seed)
+    prices = np.round(rng.uniform(500, 150000, cases), 2)
+    co2 = rng.integers(0, 320, cases)
+    rates = np.round(rng.uniform(1.05, 1.25, cases), 4)
+    fuel = rng.integers(0, 4, cases)
+    ages = rng.integers(0, 16, cases)
+    transport = rng.integers(0, 2, cases)
+    origin = rng.integers(0, 2, cases)
+    return [(float(prices[i]), int(co2[i]), float(rates[i]), FUEL_TYPES[fuel[i]], int(ages[i]),
+             TRANSPORT_METHODS[transport[i]], ORIGINS[origin[i]]) for i in range(cases)]
+
+
+def run_core(corpus) -> List[tuple]:
+    results = []
+    for price, co2, rate, fuel, age, transport, origin in corpus:
+        costs = vrt_core.calculate_costs(price * rate, co2, fuel, age, transport, origin)
+        results.append(tuple(vrt_core.round_cents(costs[field]) for field in FIELDS))
+    return results
+
+
+def _nested(result: Dict) -> tuple:
+    return (result['customs_duty'], result['vrt_calculation']['final_vrt'],
+            result['vat_calculation']['vat_amount'], result['total_import_cost'])
+
+
+def _layout(result: Dict) -> tuple:
+    """Nested key structure of a result, with the purchase details it reports"""
+    keys = tuple(sorted((key, tuple(sorted(value)) if isinstance(value, dict) else None)
+                        for key, value in result.items()))
+    return keys, tuple(sorted(result['purchase_details'].items()))
+
+
+def layout_mismatches(corpus, limit: int = 5) -> List[str]:
+    """Cases where the web and enhanced calculators disagree on result layout or purchase details"""
+    from app import VRTCalculatorWeb
+    from vrt_calculator_enhanced import EnhancedVRTCalculator
+    web, enhanced = VRTCalculatorWeb(), EnhancedVRTCalculator()
+    found = []
+    for price, co2, rate, fuel, age, transport, origin in corpus:
+        # Corpus rates are already at 4 dp - add a remainder so rounding shows up
+        rate += 1 / 3e5
+        want = _layout(web.calculate_comprehensive_costs(price, co2, fuel, age, transport, origin,
+                                                         exchange_rate=rate))
+        got = _layout(enhanced.calculate_comprehensive_costs(price, co2, fuel, age, transport, origin, rate))
+        if want != got:
+            case = (price, co2, rate, fuel, age, transport, origin)
+            found.append(f"    {dict(zip(INPUTS, case))}: web {dict(want[1])}, enhanced {dict(got[1])}")
+            if len(found) == limit:
+                break
+    return found
+
+
+def repricing_mismatches(corpus, limit: int = 5) -> List[str]:
+    """
+    Store web quotes, reprice them with every band one point dearer and compare the
+    new values to the core. Rates get a remainder past 4 dp, as cross-currency rates
+    have, so repricing from the rounded stored rate would show up
+    """
+    from app import VRTCalculatorWeb
+    from history_store import HistoryStore
+    from repricing import reprice
+
+    calculator = VRTCalculatorWeb()
+    new_bands = [(low, high, rate + 1, minimum) for low, high, rate, minimum in vrt_core.CO2_BANDS]
+    new_table = vrt_core.BandTable(new_bands)
+    cases = [(price, co2, rate + 1 / 3e5, fuel, age, transport, origin)
+             for price, co2, rate, fuel, age, transport, origin in corpus]
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = HistoryStore(os.path.join(directory, 'history.jsonl'), flush_interval=0)
+        for price, co2, rate, fuel, age, transport, origin in cases:
+            store.append(calculator.calculate_comprehensive_costs(price, co2, fuel, age, transport, origin,
+                                                                  exchange_rate=rate))
+        store.flush()
+        chunks = list(reprice(store, vrt_core.CO2_BANDS, new_bands))
+
+    offsets = np.concatenate([chunk['offset'] for chunk in chunks])
+    order = np.argsort(offsets, kind='stable')
+    got = list(zip(*(np.concatenate([chunk[f'new_{field}'] for chunk in chunks])[order].tolist()
+                     for field in FIELDS)))
+    if len(got) != len(cases):
+        return [f"    repriced {len(got)} of {len(cases)} stored quotes"]
+
+    expected = []
+    for price, co2, rate, fuel, age, transport, origin in cases:
+        costs = vrt_core.calculate_costs(price * rate, co2, fuel, age, transport, origin, new_table)
+        expected.append(tuple(vrt_core.round_cents(costs[field]) for field in FIELDS))
+    found = mismatches(cases, expected, got, limit)
+    # Customs duty doesn't depend on the band
+    duty_moved = int(sum((chunk['delta_customs_duty'] != 0).sum() for chunk in chunks))
+    if duty_moved:
+        found.append(f"    customs duty changed on {duty_moved} quotes after a band-only change")
+    return found
+
+
+def run_web(corpus) -> List[tuple]:
+    from app import VRTCalculatorWeb
+    calculator = VRTCalculatorWeb()
+    return [_nested(calculator.calculate_comprehensive_costs(price, co2, fuel, age, transport, origin,
+                                                             exchange_rate=rate))
+            for price, co2, rate, fuel, age, transport, origin in corpus]
+
+
+def run_enhanced(corpus) -> List[tuple]:
+    from vrt_calculator_enhanced import EnhancedVRTCalculator
+    calculator = EnhancedVRTCalculator()
+    return [_nested(calculator.calculate_comprehensive_costs(price, co2, fuel, age, transport, origin, rate))
+            for price, co2, rate, fuel, age, transport, origin in corpus]
+
+
+def run_basic(corpus) -> List[tuple]:
+    from vrt_calculator import VRTCalculator
+    calculator = VRTCalculator()
+    results = []
+    for price, co2, rate, fuel, age, transport, origin in corpus:
+        omv = calculator.get_omv_from_uk_price(price, rate, transport)
+        result = calculator.calculate_vrt(omv, co2, fuel, age, price * rate, origin)
+        results.append(tuple(result[field] for field in FIELDS))
+    return results
+
+
+def run_batch(corpus) -> List[tuple]:
+    columns = list(zip(*corpus))
+    result = calculate_batch(vrt_core.CO2_BANDS, np.array(columns[0]), np.array(columns[1]),
+                             np.array(columns[2]), encode(columns[3], FUEL_TYPES),
+                             np.array(columns[4]), encode(columns[5], TRANSPORT_METHODS),
+                             encode(columns[6], ORIGINS))
+    return list(zip(*(result[field].tolist() for field in FIELDS)))
+
+
+def run_js(corpus):
+    """(results, seconds spent pricing inside node) - the process start is not timed"""
+    corpus_path = os.path.join(BASE_DIR, 'data', '.parity_corpus.json')
+    with open(corpus_path, 'w') as f:
+        json.dump(corpus, f)
+    try:
+        output = subprocess.run(
+            ['node', '-e', JS_RUNNER, vrt_core.TARIFF_JS_PATH,
+             os.path.join(BASE_DIR, 'static', 'js', 'app.js'), corpus_path],
+            check=True, capture_output=True, text=True).stdout
+    finally:
+        os.remove(corpus_path)
+    data = json.loads(output)
+    return [tuple(r) for r in data['results']], data['seconds']
+
+
+ENTRY_POINTS: Dict[str, Callable] = {
+    'vrt_core.calculate_costs': run_core,
+    'VRTCalculatorWeb.calculate_comprehensive_costs': run_web,
+    'EnhancedVRTCalculator.calculate_comprehensive_costs': run_enhanced,
+    'VRTCalculator.calculate_vrt': run_basic,
+    'batch_calculator.calculate_batch': run_batch
+}
+
+
+def read_golden(path: str = GOLDEN_PATH):
+    """(corpus, expected results) from the golden file"""
+    corpus, expected = [], []
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            corpus.append((float(row['uk_price_gbp']), int(row['co2_emissions']), float(row['exchange_rate']),
+                           row['fuel_type'], int(row['vehicle_age_years']), row['transport_method'],
+                           row['import_origin']))
+            expected.append(tuple(float(row[field]) for field in FIELDS))
+    return corpus, expected
+
+
+def write_golden(path: str = GOLDEN_PATH):
+    corpus = generate_corpus(GOLDEN_CASES, GOLDEN_SEED)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(INPUTS + FIELDS)
+        for case, result in zip(corpus, run_core(corpus)):
+            writer.writerow(case + result)
+
+
+def mismatches(corpus, expected, actual, limit: int = 5) -> List[str]:
+    """Descriptions of the first few cases where actual differs from expected"""
+    found = []
+    for case, want, got in zip(corpus, expected, actual):
+        if want != got:
+            found.append(f"    {dict(zip(INPUTS, case))}: expected {want}, got {got}")
+            if len(found) == limit:
+                break
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check every VRT calculator against the shared core")
+    parser.add_argument('--cases', type=int, default=100_000, help="Random cases to compare (default: 100000)")
+    parser.add_argument('--seed', type=int, default=1, help="Corpus seed (default: 1)")
+    parser.add_argument('--update-golden', action='store_true',
+                        help="Rewrite data/golden_costs.csv from the current core (after a deliberate tariff change)")
+    args = parser.parse_args()
+
+    if args.update_golden:
+        write_golden()
+        print(f"Wrote {GOLDEN_CASES} cases to {GOLDEN_PATH} (tariff {vrt_core.DEFAULT_BANDS.version})")
+        return
+
+    failed = False
+
+    # Golden file: pins the core's formula
+    golden_corpus, golden = read_golden()
+    problems = mismatches(golden_corpus, golden, run_core(golden_corpus))
+    print(f"golden file ({len(golden_corpus)} cases): {'FAIL' if problems else 'ok'}")
+    failed |= bool(problems)
+    if problems:
+        print("\n".join(problems))
+
+    # Random corpus: every entry point against the core
+    corpus = generate_corpus(args.cases, args.seed)
+    print(f"\n{args.cases} random cases (seed {args.seed}), tariff {vrt_core.DEFAULT_BANDS.version}")
+    print(f"{'entry point':<52} {'cases/s':>12}  result")
+
+    timings = {}
+    for name, run in ENTRY_POINTS.items():
+        start = time.perf_counter()
+        # The calculators print warnings (fallback rates etc.) - keep the report readable
+        with redirect_stdout(io.StringIO()):
+            results = run(corpus)
+        timings[name] = (results, time.perf_counter() - start)
+
+    if shutil.which('node'):
+        timings['app.js quickEstimate'] = run_js(corpus)
+    else:
+        print("(node not found - skipping the app.js quick estimate)")
+
+    reference = timings['vrt_core.calculate_costs'][0]
+    for name, (results, seconds) in timings.items():
+        problems = mismatches(corpus, reference, results)
+        failed |= bool(problems)
+        print(f"{name:<52} {args.cases / seconds:>12,.0f}  {'FAIL' if problems else 'ok'}")
+        if problems:
+            print("\n".join(problems))
+
+    # Web and enhanced share one result layout, down to the rounding of purchase_details
+    layout_corpus = corpus[:LAYOUT_CASES]
+    with redirect_stdout(io.StringIO()):
+        problems = layout_mismatches(layout_corpus)
+    failed |= bool(problems)
+    print(f"\nweb/enhanced result layout ({len(layout_corpus)} cases): {'FAIL' if problems else 'ok'}")
+    if problems:
+        print("\n".join(problems))
+
+    # Stored quotes reprice to the cent after a band-only change
+    repricing_corpus = corpus[:REPRICING_CASES]
+    with redirect_stdout(io.StringIO()):
+        problems = repricing_mismatches(repricing_corpus)
+    failed |= bool(problems)
+    print(f"band-only repricing ({len(repricing_corpus)} cases): {'FAIL' if problems else 'ok'}")
+    if problems:
+        print("\n".join(problems))
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+Server-sent exchange rate updates for the VRT calculator
+Under gunicorn a single refresher in the master fetches the rate table on a fixed
+interval and shares it with the workers through a snapshot file. Each worker
+publishes a pre-serialised event from it; every connected browser waits on the
+same condition, so an open stream costs one idle waiter and no upstream calls
+
+Streams are held open only under a cooperative worker (gunicorn -k gevent),
+where a waiting connection is a greenlet rather than a thread. Otherwise each
+connection gets the current rate and is told when to reconnect (long-poll), so
+sync workers are never tied up by idle browsers
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Iterator, Optional
+
+from exchange_rates import RateSnapshot, get_rate_snapshot
+
+# Seconds between upstream refreshes while browsers are connected
+REFRESH_INTERVAL = int(os.environ.get('RATE_STREAM_REFRESH', 300))
+
+# Snapshot written by the master's refresher and read by every worker
+SHARED_SNAPSHOT_PATH = os.environ.get('RATE_SNAPSHOT_PATH',
+                                      os.path.join(tempfile.gettempdir(), 'vrt_rate_snapshot.json'))
+
+# Comment lines sent on idle streams so proxies don't drop them (seconds)
+HEARTBEAT_INTERVAL = 15
+
+# 'stream', 'poll', or 'auto' (stream only under a gevent-patched worker)
+STREAM_MODE = os.environ.get('RATE_STREAM_MODE', 'auto').lower()
+
+
+def cooperative_worker() -> bool:
+    """True when threading has been monkey-patched by gevent"""
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('threading')
+
+
+def write_shared_snapshot(snapshot: RateSnapshot, path: str = SHARED_SNAPSHOT_PATH):
+    """Replace the shared snapshot file atomically, so workers never read a partial one"""
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(snapshot.to_dict(), f)
+    os.replace(temp_path, path)
+
+
+def read_shared_snapshot(max_age: float, path: str = SHARED_SNAPSHOT_PATH) -> Optional[RateSnapshot]:
+    """The shared snapshot, or None if there is none or it is older than max_age seconds"""
+    try:
+        with open(path) as f:
+            snapshot = RateSnapshot.from_dict(json.load(f))
+    except (OSError, ValueError, KeyError):
+        return None
+    if (datetime.now() - snapshot.fetched_at).total_seconds() > max_age:
+        return None
+    return snapshot
+
+
+def start_shared_refresher(refresh_interval: int = REFRESH_INTERVAL, path: str = SHARED_SNAPSHOT_PATH):
+    """
+    Fetch the rate table every refresh_interval seconds and write it to the shared file
+    Call once in the gunicorn master (gunicorn.conf.py does), so N workers make one
+    upstream call per interval between them rather than one each
+    """
+    owner = os.getpid()
+
+    def refresh_loop():
+        snapshot = get_rate_snapshot()
+        # Forked workers can inherit this loop (gevent greenlets survive fork) - only the master runs it
+        while os.getpid() == owner:
+            try:
+                write_shared_snapshot(snapshot, path)
+            except OSError:
+                pass
+            time.sleep(refresh_interval)
+            try:
+                snapshot = get_rate_snapshot(force_refresh=True)
+            except Exception:
+                pass
+
+    threading.Thread(target=refresh_loop, name='shared-rate-refresher', daemon=True).start()
+
+
+def _format_event(snapshot) -> str:
+    data = {
+        'gbp_to_eur': snapshot.rate('GBP', 'EUR'),
+        'timestamp': snapshot.fetched_at.isoformat(),
+        'is_fallback': snapshot.is_fallback
+    }
+    return f"event: rate\ndata: {json.dumps(data)}\n\n"
+
+
+class RateBroadcaster:
+    """Publishes rate changes from a single refresher to any number of subscribers"""
+
+    def __init__(self, refresh_interval: int = REFRESH_INTERVAL,
+                 heartbeat_interval: int = HEARTBEAT_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self.heartbeat_interval = heartbeat_interval
+        self._condition = threading.Condition()
+        self._version = 0
+        self._event = None
+        self._rate_key = None
+        self._subscribers = 0
+        self._refresher_pid = None
+
+    @property
+    def subscribers(self) -> int:
+        return self._subscribers
+
+    def publish(self, snapshot) -> bool:
+        """Store the event for snapshot and wake subscribers if the rate changed"""
+        rate_key = (snapshot.rate('GBP', 'EUR'), snapshot.is_fallback)
+        with self._condition:
+            if rate_key == self._rate_key:
+                return False
+            self._rate_key = rate_key
+            self._event = _format_event(snapshot)
+            self._version += 1
+            self._condition.notify_all()
+        return True
+
+    def latest_snapshot(self, max_age: Optional[float] = None) -> RateSnapshot:
+        """
+        The master's shared snapshot while it is current, otherwise this process's cached one
+        max_age bounds how old the cached snapshot may be (default: the rate cache TTL)
+        """
+        # The master refreshes every interval; allow one missed refresh before falling back
+        snapshot = read_shared_snapshot(2 * self.refresh_interval)
+        if snapshot is not None:
+            return snapshot
+        return get_rate_snapshot(max_age=max_age)
+
+    def current_event(self) -> str:
+        """Latest event, publishing the current snapshot first if nothing has been sent yet"""
+        if self._event is None:
+            self.publish(self.latest_snapshot())
+        return self._event
+
+    def _refresh_loop(self):
+        while True:
+            time.sleep(self.refresh_interval)
+            # Idle workers don't read or fetch rates. Without a master refresher (flask run),
+            # a snapshot younger than the interval is reused, so workers share the cache TTL
+            if self._subscribers:
+                try:
+                    self.publish(self.latest_snapshot(max_age=self.refresh_interval))
+                except Exception:
+                    pass
+
+    def ensure_refresher(self):
+        """Start the refresher in this process (threads don't survive the fork from a preloading master)"""
+        with self._condition:
+            if self._refresher_pid == os.getpid():
+                return
+            self._refresher_pid = os.getpid()
+        threading.Thread(target=self._refresh_loop, name='rate-refresher', daemon=True).start()
+
+    def stream(self) -> Iterator[str]:
+        """Server-sent events: the current rate, then each change, with heartbeats in between"""
+        self.ensure_refresher()
+        with self._condition:
+            self._subscribers += 1
+        try:
+            yield f"retry: {self.heartbeat_interval * 1000}\n"
+            yield self.current_event()
+            version = self._version
+            while True:
+                with self._condition:
+                    if self._version == version:
+                        self._condition.wait(self.heartbeat_interval)
+                    changed = self._version != version
+                    version, event = self._version, self._event
+                yield event if changed else ": keep-alive\n\n"
+        finally:
+            with self._condition:
+                self._subscribers -= 1
+
+    def poll(self) -> Iterator[str]:
+        """Long-poll fallback: the current rate and a reconnect delay, then close"""
+        # The shared snapshot (or the cache TTL) limits upstream calls
+        self.publish(self.latest_snapshot())
+        yield f"retry: {self.refresh_interval * 1000}\n"
+        yield self._event
+
+    def events(self, mode: Optional[str] = None) -> Iterator[str]:
+        mode = mode or STREAM_MODE
+        if mode == 'stream' or (mode == 'auto' and cooperative_worker()):
+            return self.stream()
+        return self.poll()
+
+
+broadcaster = RateBroadcaster()
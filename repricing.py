@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Incremental repricing of stored quotes for the VRT calculator
+When the exchange rate or the CO2 band table changes, the history index (CO2,
+origin, fuel, currency) picks out only the quotes the change can affect; those
+are read and recomputed in vectorised chunks and the differences are reported
+"""
+
+import argparse
+import csv
+import json
+import math
+import sys
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from batch_calculator import FUEL_TYPES, ORIGINS, calculate_batch, encode, load_co2_bands, lookup_bands
+from history_store import DEFAULT_HISTORY_PATH, INDEX_ENTRY, HistoryStore, currency_code
+
+# The history store's sidecar index entry as a NumPy record
+INDEX_DTYPE = np.dtype([
+    ('offset', '<u8'), ('length', '<u4'), ('timestamp', '<f8'),
+    ('co2_emissions', '<u2'), ('origin', 'u1'), ('fuel', 'u1'), ('currency', 'S3')
+])
+assert INDEX_DTYPE.itemsize == INDEX_ENTRY.size
+
+# Result fields compared before and after repricing
+DELTA_FIELDS = ('customs_duty', 'final_vrt', 'vat_amount', 'total_import_cost')
+
+DEFAULT_CHUNK_SIZE = 10000
+
+
+def load_index(store: HistoryStore) -> np.ndarray:
+    """
+    The store's index as one structured array (a single read, no per-entry objects)
+    Hold store.read_lock() from here until the selected records have been read
+    """
+    try:
+        data = np.fromfile(store.index_path, dtype=np.uint8)
+    except FileNotFoundError:
+        return np.empty(0, dtype=INDEX_DTYPE)
+    usable = len(data) - len(data) % INDEX_DTYPE.itemsize
+    return data[:usable].view(INDEX_DTYPE)
+
+
+def affected_co2(current_bands, new_bands, max_co2: int = 0xFFFF) -> np.ndarray:
+    """Table over whole g/km values: True where the new bands change the rate or minimum"""
+    co2 = np.arange(max_co2 + 1)
+    old, new = lookup_bands(co2, current_bands), lookup_bands(co2, new_bands)
+    return (old['rate'] != new['rate']) | (old['minimum'] != new['minimum'])
+
+
+def select_quotes(index: np.ndarray, affected: Optional[np.ndarray] = None,
+                  since: Optional[float] = None, until: Optional[float] = None,
+                  origin: Optional[str] = None, fuel_type: Optional[str] = None,
+                  currencies: Optional[List[str]] = None) -> np.ndarray:
+    """
+    Index entries a change can affect, narrowed by time (epoch seconds), origin and fuel
+    affected (from affected_co2) and currencies (with a new rate) each select the quotes
+    they reach; with neither, every quote in range is selected
+    """
+    if affected is None and not currencies:
+        mask = np.ones(len(index), dtype=bool)
+    else:
+        mask = np.zeros(len(index), dtype=bool)
+        if affected is not None:
+            mask |= affected[index['co2_emissions']]
+        if currencies:
+            mask |= np.isin(index['currency'], [currency_code(currency) for currency in currencies])
+    if since is not None:
+        mask &= index['timestamp'] >= since
+    if until is not None:
+        mask &= index['timestamp'] <= until
+    if origin:
+        mask &= index['origin'] == ORIGINS.index(origin.lower())
+    if fuel_type:
+        mask &= index['fuel'] == encode([fuel_type], FUEL_TYPES)[0]
+    return index[mask]
+
+
+def _read_records(path: str, entries: np.ndarray) -> List[Dict]:
+    records = []
+    with open(path, 'rb') as f:
+        for offset, length in zip(entries['offset'].tolist(), entries['length'].tolist()):
+            f.seek(offset)
+            records.append(json.loads(f.read(length)))
+    return records
+
+
+def quote_columns(records: List[Dict]) -> Dict[str, np.ndarray]:
+    """
+    Pull the inputs and stored results of web quotes into columns
+    Quotes saved before age and transport method were recorded (or CLI results)
+    can't be recomputed and are flagged invalid
+    """
+    count = len(records)
+    columns = {name: np.zeros(count) for name in
+               ('purchase_price', 'exchange_rate', 'vehicle_value_eur') + DELTA_FIELDS}
+    columns['co2_emissions'] = np.zeros(count, dtype=np.int32)
+    columns['vehicle_age_years'] = np.zeros(count, dtype=np.int16)
+    columns['valid'] = np.zeros(count, dtype=bool)
+    columns['exact_rate'] = np.zeros(count, dtype=bool)
+    currencies, fuels, transports, origins = [], [], [], []
+
+    for i, record in enumerate(records):
+        details = record.get('purchase_details', {})
+        currencies.append(details.get('source_currency', 'GBP'))
+        fuels.append(details.get('fuel_type'))
+        transports.append(details.get('transport_method'))
+        origins.append(details.get('import_origin'))
+        if 'vrt_calculation' not in record or 'vehicle_age_years' not in details:
+            continue
+        columns['valid'][i] = True
+        columns['purchase_price'][i] = details.get('purchase_price', details.get('uk_price_gbp', 0))
+        columns['exact_rate'][i] = 'exchange_rate_exact' in details
+        columns['exchange_rate'][i] = details.get('exchange_rate_exact', details['exchange_rate'])
+        columns['vehicle_value_eur'][i] = details['vehicle_value_eur']
+        columns['vehicle_age_years'][i] = details['vehicle_age_years']
+        columns['co2_emissions'][i] = record['vrt_calculation']['co2_emissions']
+        columns['final_vrt'][i] = record['vrt_calculation']['final_vrt']
+        columns['vat_amount'][i] = record['vat_calculation']['vat_amount']
+        columns['customs_duty'][i] = record['customs_duty']
+        columns['total_import_cost'][i] = record['total_import_cost']
+
+    columns['source_currency'] = np.array(currencies, dtype=object)
+    columns['fuel_type'] = encode(fuels, FUEL_TYPES)
+    columns['transport_method'] = encode(transports, ('ferry', 'drive'), default=1)
+    columns['import_origin'] = encode(origins, ORIGINS, default=1)
+    return columns
+
+
+def reprice(store: HistoryStore, current_bands, new_bands=None,
+            rates: Optional[Dict[str, float]] = None, since: Optional[float] = None,
+            until: Optional[float] = None, origin: Optional[str] = None,
+            fuel_type: Optional[str] = None,
+            chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Dict[str, np.ndarray]]:
+    """
+    Reprice stored quotes under new bands and/or new rates (source currency -> EUR)
+    Yields one dict of columns per chunk: quote offset and time, keys, and the
+    old, new and delta value of each field in DELTA_FIELDS
+    """
+    rates = {currency.upper(): rate for currency, rate in (rates or {}).items()}
+    if new_bands is None and not rates:
+        return
+    bands = new_bands or current_bands
+
+    # A band change reaches quotes in the changed bands; a rate change reaches quotes in that currency
+    affected = affected_co2(current_bands, new_bands) if new_bands is not None else None
+    store.flush()
+    with store.read_lock():
+        selected = select_quotes(load_index(store), affected, since, until, origin, fuel_type, list(rates))
+
+        for start in range(0, len(selected), chunk_size):
+            entries = selected[start:start + chunk_size]
+            quotes = quote_columns(_read_records(store.path, entries))
+
+            # Quotes in a currency with a new rate are reconverted; the rest keep their rate
+            new_rate = np.array([rates.get(currency.upper(), math.nan)
+                                 for currency in quotes['source_currency']], dtype=np.float64)
+            reconverted = ~np.isnan(new_rate)
+            exchange_rate = np.where(reconverted, new_rate, quotes['exchange_rate'])
+            # Only quotes that were reconverted or sit in a changed band can move
+            if affected is not None:
+                in_changed_band = affected[np.minimum(quotes['co2_emissions'], len(affected) - 1)]
+            else:
+                in_changed_band = np.zeros(len(entries), dtype=bool)
+            valid = quotes['valid'] & (reconverted | in_changed_band)
+
+            # Recompute from the purchase price, not the stored (rounded) EUR value. Older
+            # quotes kept only the 4 dp rate; where that doesn't reproduce the stored EUR
+            # value, a quote that isn't reconverted keeps the stored value instead
+            vehicle_value_eur = quotes['purchase_price'] * exchange_rate
+            stale_rate = ~quotes['exact_rate'] & (vehicle_value_eur.round(2) != quotes['vehicle_value_eur'])
+            vehicle_value_eur = np.where(stale_rate & ~reconverted, quotes['vehicle_value_eur'], vehicle_value_eur)
+
+            result = calculate_batch(bands, vehicle_value_eur[valid], quotes['co2_emissions'][valid], 1.0,
+                                     quotes['fuel_type'][valid], quotes['vehicle_age_years'][valid],
+                                     quotes['transport_method'][valid], quotes['import_origin'][valid])
+
+            chunk = {
+                'offset': entries['offset'][valid],
+                'timestamp': entries['timestamp'][valid],
+                'co2_emissions': quotes['co2_emissions'][valid],
+                'import_origin': quotes['import_origin'][valid],
+                'fuel_type': quotes['fuel_type'][valid],
+                'source_currency': quotes['source_currency'][valid],
+                'old_exchange_rate': quotes['exchange_rate'][valid],
+                'new_exchange_rate': exchange_rate[valid],
+                'skipped': int((~quotes['valid']).sum())
+            }
+            for field in DELTA_FIELDS:
+                chunk[f'old_{field}'] = quotes[field][valid]
+                chunk[f'new_{field}'] = result[field]
+                chunk[f'delta_{field}'] = (result[field] - quotes[field][valid]).round(2)
+            yield chunk
+
+
+class RepricingSummary:
+    """Running totals over repriced chunks"""
+
+    def __init__(self, min_delta: float = 0.01):
+        self.min_delta = min_delta
+        self.repriced = 0
+        self.changed = 0
+        self.skipped = 0
+        self.increases = 0
+        self.decreases = 0
+        self.totals = {field: 0.0 for field in DELTA_FIELDS}
+        self.largest_increase = 0.0
+        self.largest_decrease = 0.0
+
+    def changed_mask(self, chunk: Dict[str, np.ndarray]) -> np.ndarray:
+        return np.abs(chunk['delta_total_import_cost']) >= self.min_delta
+
+    def add(self, chunk: Dict[str, np.ndarray]):
+        delta = chunk['delta_total_import_cost']
+        self.repriced += len(delta)
+        self.skipped += chunk['skipped']
+        self.changed += int(self.changed_mask(chunk).sum())
+        self.increases += int((delta >= self.min_delta).sum())
+        self.decreases += int((delta <= -self.min_delta).sum())
+        for field in DELTA_FIELDS:
+            self.totals[field] += float(chunk[f'delta_{field}'].sum())
+        if len(delta):
+            self.largest_increase = max(self.largest_increase, float(delta.max()))
+            self.largest_decrease = min(self.largest_decrease, float(delta.min()))
+
+    def to_dict(self) -> Dict:
+        return {
+            'quotes_repriced': self.repriced,
+            'quotes_changed': self.changed,
+            'quotes_skipped': self.skipped,
+            'increases': self.increases,
+            'decreases': self.decreases,
+            'total_delta': {field: round(value, 2) for field, value in self.totals.items()},
+            'largest_increase': round(self.largest_increase, 2),
+            'largest_decrease': round(self.largest_decrease, 2)
+        }
+
+
+DELTA_CSV_COLUMNS = (
+    ['quote_offset', 'calculation_date', 'co2_emissions', 'import_origin', 'fuel_type',
+     'source_currency', 'old_exchange_rate', 'new_exchange_rate'] +
+    [f'{prefix}_{field}' for field in DELTA_FIELDS for prefix in ('old', 'new', 'delta')]
+)
+
+
+def write_delta_rows(writer, chunk: Dict[str, np.ndarray], mask: np.ndarray):
+    """Write the changed quotes of a chunk as CSV rows"""
+    columns = [
+        chunk['offset'][mask],
+        [datetime.fromtimestamp(t).isoformat() for t in chunk['timestamp'][mask]],
+        chunk['co2_emissions'][mask],
+        [ORIGINS[code] for code in chunk['import_origin'][mask]],
+        [FUEL_TYPES[code] for code in chunk['fuel_type'][mask]],
+        chunk['source_currency'][mask],
+        chunk['old_exchange_rate'][mask].round(4),
+        chunk['new_exchange_rate'][mask].round(4)
+    ]
+    for field in DELTA_FIELDS:
+        columns += [chunk[f'old_{field}'][mask], chunk[f'new_{field}'][mask], chunk[f'delta_{field}'][mask]]
+    writer.writerows(zip(*(list(column) for column in columns)))
+
+
+def _parse_rates(values: List[str]) -> Dict[str, float]:
+    rates = {}
+    for value in values:
+        currency, _, rate = value.partition('=')
+        rates[currency.upper()] = float(rate)
+    return rates
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reprice stored quotes after a tariff or rate change")
+    parser.add_argument('--path', default=DEFAULT_HISTORY_PATH, help="History log file")
+    parser.add_argument('--bands', help="New CO2 band table (JSON, see batch_calculator.load_co2_bands)")
+    parser.add_argument('--exchange-rate', type=float, help="New GBP to EUR rate")
+    parser.add_argument('--rate', action='append', default=[], metavar='CUR=RATE',
+                        help="New rate to EUR for another source currency (repeatable)")
+    parser.add_argument('--current-rates', action='store_true',
+                        help="Reprice every currency at the latest rates from the rate API")
+    parser.add_argument('--since', help="Only quotes from this ISO date/time")
+    parser.add_argument('--until', help="Only quotes up to this ISO date/time")
+    parser.add_argument('--origin', choices=ORIGINS)
+    parser.add_argument('--fuel', choices=FUEL_TYPES)
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--min-delta', type=float, default=0.01,
+                        help="Smallest total change (EUR) counted as a change")
+    parser.add_argument('--output', help="Write changed quotes to this CSV file")
+    args = parser.parse_args()
+
+    from app import VRTCalculatorWeb
+    calculator = VRTCalculatorWeb()
+
+    rates = {}
+    if args.current_rates:
+        snapshot = calculator.get_rate_snapshot(force_refresh=True)
+        rates = {currency: snapshot.rate(currency, 'EUR') for currency in snapshot.currencies}
+    rates.update(_parse_rates(args.rate))
+    if args.exchange_rate:
+        rates['GBP'] = args.exchange_rate
+
+    new_bands = load_co2_bands(args.bands) if args.bands else None
+    if new_bands is None and not rates:
+        parser.error("nothing to reprice - give --bands and/or a new rate")
+
+    store = HistoryStore(args.path)
+    chunks = reprice(store, calculator.co2_bands, new_bands, rates,
+                     since=datetime.fromisoformat(args.since).timestamp() if args.since else None,
+                     until=datetime.fromisoformat(args.until).timestamp() if args.until else None,
+                     origin=args.origin, fuel_type=args.fuel, chunk_size=args.chunk_size)
+
+    summary = RepricingSummary(args.min_delta)
+    output = open(args.output, 'w', newline='') if args.output else None
+    try:
+        writer = csv.writer(output) if output else None
+        if writer:
+            writer.writerow(DELTA_CSV_COLUMNS)
+        for chunk in chunks:
+            summary.add(chunk)
+            if writer:
+                write_delta_rows(writer, chunk, summary.changed_mask(chunk))
+    finally:
+        if output:
+            output.close()
+
+    json.dump(summary.to_dict(), sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
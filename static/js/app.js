@@ -28,7 +28,6 @@ function initializeFormValidation() {
     const form = document.getElementById('vrtForm');
     const ukPriceInput = document.getElementById('uk_price');
     const co2Input = document.getElementById('co2_emissions');
-    const fuelTypeSelect = document.getElementById('fuel_type');
 
     // Real-time validation
     ukPriceInput.addEventListener('input', function() {
@@ -40,10 +39,6 @@ function initializeFormValidation() {
         updateVRTRateIndicator(this.value);
     });
 
-    fuelTypeSelect.addEventListener('change', function() {
-        updateMinimumVRTInfo(this.value);
-    });
-
     // Form submission validation
     form.addEventListener('submit', function(e) {
         if (!validateForm()) {
@@ -103,95 +98,48 @@ function createFeedbackElement(parent) {
     return feedback;
 }
 
+// Emissions description by VRT rate: (highest rate, className, description)
+const VRT_RATE_DESCRIPTIONS = [
+    [7, 'co2-low', 'Very low emissions - Excellent'],
+    [9, 'co2-low', 'Low emissions - Very good'],
+    [9.75, 'co2-low', 'Low emissions - Good'],
+    [12, 'co2-low', 'Moderate emissions'],
+    [13.5, 'co2-medium', 'Moderate emissions'],
+    [17.5, 'co2-medium', 'Higher emissions'],
+    [20, 'co2-medium', 'High emissions'],
+    [21.5, 'co2-high', 'High emissions'],
+    [30, 'co2-high', 'Very high emissions'],
+    [35, 'co2-high', 'Extremely high emissions']
+];
+
+// CO2 band [min, max, rate, minimum] from the generated tariff table (vrt_tariff.js)
+function findVrtBand(co2) {
+    const bands = VRT_TARIFF.co2Bands;
+    for (const band of bands) {
+        if (band[0] <= co2 && (band[1] === null || co2 <= band[1])) return band;
+    }
+    // Default to the highest band if not found
+    return bands[bands.length - 1];
+}
+
+// Round to cents half-to-even, as vrt_core.round_cents does
+function roundCents(value) {
+    const scaled = value * 100;
+    let rounded = Math.round(scaled);
+    if (rounded - scaled === 0.5 && rounded % 2 !== 0) rounded -= 1;
+    return rounded / 100;
+}
+
 // Update VRT rate indicator based on CO2 emissions
 function updateVRTRateIndicator(co2Value) {
     const co2 = parseInt(co2Value);
     if (isNaN(co2)) return;
 
-    let rate, className, description;
-    
-    // Official Irish Revenue VRT rates
-    if (co2 <= 50) {
-        rate = 7;
-        className = 'co2-low';
-        description = 'Very low emissions - Excellent';
-    } else if (co2 <= 80) {
-        rate = 9;
-        className = 'co2-low';
-        description = 'Low emissions - Very good';
-    } else if (co2 <= 85) {
-        rate = 9.75;
-        className = 'co2-low';
-        description = 'Low emissions - Good';
-    } else if (co2 <= 90) {
-        rate = 10.5;
-        className = 'co2-low';
-        description = 'Moderate emissions';
-    } else if (co2 <= 95) {
-        rate = 11.25;
-        className = 'co2-low';
-        description = 'Moderate emissions';
-    } else if (co2 <= 100) {
-        rate = 12;
-        className = 'co2-low';
-        description = 'Moderate emissions';
-    } else if (co2 <= 105) {
-        rate = 12.75;
-        className = 'co2-medium';
-        description = 'Moderate emissions';
-    } else if (co2 <= 110) {
-        rate = 13.5;
-        className = 'co2-medium';
-        description = 'Moderate emissions';
-    } else if (co2 <= 115) {
-        rate = 15.25;
-        className = 'co2-medium';
-        description = 'Higher emissions';
-    } else if (co2 <= 120) {
-        rate = 16;
-        className = 'co2-medium';
-        description = 'Higher emissions';
-    } else if (co2 <= 125) {
-        rate = 16.75;
-        className = 'co2-medium';
-        description = 'Higher emissions';
-    } else if (co2 <= 130) {
-        rate = 17.5;
-        className = 'co2-medium';
-        description = 'Higher emissions';
-    } else if (co2 <= 135) {
-        rate = 19.25;
-        className = 'co2-medium';
-        description = 'High emissions';
-    } else if (co2 <= 140) {
-        rate = 20;
-        className = 'co2-medium';
-        description = 'High emissions';
-    } else if (co2 <= 145) {
-        rate = 21.5;
-        className = 'co2-high';
-        description = 'High emissions';
-    } else if (co2 <= 150) {
-        rate = 25;
-        className = 'co2-high';
-        description = 'Very high emissions';
-    } else if (co2 <= 155) {
-        rate = 27.5;
-        className = 'co2-high';
-        description = 'Very high emissions';
-    } else if (co2 <= 170) {
-        rate = 30;
-        className = 'co2-high';
-        description = 'Very high emissions';
-    } else if (co2 <= 190) {
-        rate = 35;
-        className = 'co2-high';
-        description = 'Extremely high emissions';
-    } else {
-        rate = 41;
-        className = 'co2-high';
-        description = 'Maximum VRT rate';
-    }
+    const [, maxCo2, rate, minimum] = findVrtBand(co2);
+    const match = VRT_RATE_DESCRIPTIONS.find(([highest]) => rate <= highest);
+    const [className, description] = maxCo2 === null || !match
+        ? ['co2-high', 'Maximum VRT rate']
+        : [match[1], match[2]];
 
     // Update or create VRT rate indicator
     let indicator = document.getElementById('vrt-rate-indicator');
@@ -206,35 +154,7 @@ function updateVRTRateIndicator(co2Value) {
     indicator.innerHTML = `
         <small class="${className}">
             <i class="fas fa-info-circle"></i>
-            VRT Rate: <strong>${rate}%</strong> - ${description}
-        </small>
-    `;
-}
-
-// Update minimum VRT information based on fuel type
-function updateMinimumVRTInfo(fuelType) {
-    const minimumAmounts = {
-        'petrol': 125,
-        'diesel': 200,
-        'electric': 0,
-        'hybrid': 125
-    };
-
-    let info = document.getElementById('minimum-vrt-info');
-    if (!info) {
-        info = document.createElement('div');
-        info.id = 'minimum-vrt-info';
-        info.className = 'mt-2';
-        document.getElementById('fuel_type').parentNode.appendChild(info);
-    }
-
-    const amount = minimumAmounts[fuelType] || 125;
-    const color = fuelType === 'electric' ? 'success' : 'info';
-    
-    info.innerHTML = `
-        <small class="text-${color}">
-            <i class="fas fa-info-circle"></i>
-            Minimum VRT for ${fuelType}: <strong>€${amount}</strong>
+            VRT Rate: <strong>${rate}%</strong> (minimum €${minimum}) - ${description}
         </small>
     `;
 }
@@ -245,41 +165,77 @@ function loadExchangeRate() {
     if (!exchangeRateDisplay) return;
 
     exchangeRateDisplay.value = 'Loading...';
-    
+
+    // Rate updates are pushed by the server; fall back to a one-off fetch without EventSource
+    if (!window.EventSource) {
+        fetchExchangeRate();
+        return;
+    }
+
+    const rateStream = new EventSource('/api/exchange-rate/stream');
+    rateStream.addEventListener('rate', function(event) {
+        showExchangeRate(JSON.parse(event.data));
+    });
+    rateStream.onerror = function() {
+        // The browser reconnects on its own; only fall back if it has given up
+        if (rateStream.readyState === EventSource.CLOSED) {
+            fetchExchangeRate();
+        }
+    };
+}
+
+function fetchExchangeRate() {
     fetch('/api/exchange-rate')
         .then(response => response.json())
-        .then(data => {
-            exchangeRateDisplay.value = data.gbp_to_eur.toFixed(4);
-            
-            // Add timestamp info
-            const timestamp = new Date(data.timestamp).toLocaleString();
-            let timestampInfo = document.getElementById('exchange-rate-timestamp');
-            if (!timestampInfo) {
-                timestampInfo = document.createElement('small');
-                timestampInfo.id = 'exchange-rate-timestamp';
-                timestampInfo.className = 'text-muted d-block';
-                exchangeRateDisplay.parentNode.parentNode.appendChild(timestampInfo);
-            }
-            timestampInfo.textContent = `Updated: ${timestamp}`;
-        })
-        .catch(error => {
-            console.error('Error fetching exchange rate:', error);
-            exchangeRateDisplay.value = '1.1700 (fallback)';
-            
-            let errorInfo = document.getElementById('exchange-rate-error');
-            if (!errorInfo) {
-                errorInfo = document.createElement('small');
-                errorInfo.id = 'exchange-rate-error';
-                errorInfo.className = 'text-warning d-block';
-                exchangeRateDisplay.parentNode.parentNode.appendChild(errorInfo);
-            }
-            errorInfo.innerHTML = '<i class="fas fa-exclamation-triangle"></i> Using fallback rate - verify current rate';
-        });
+        .then(showExchangeRate)
+        .catch(showExchangeRateFallback);
+}
+
+function showExchangeRate(data) {
+    const exchangeRateDisplay = document.getElementById('exchange_rate_display');
+    const previousRate = exchangeRateDisplay.value;
+    exchangeRateDisplay.value = data.gbp_to_eur.toFixed(4);
+
+    // Add timestamp info
+    const timestamp = new Date(data.timestamp).toLocaleString();
+    let timestampInfo = document.getElementById('exchange-rate-timestamp');
+    if (!timestampInfo) {
+        timestampInfo = document.createElement('small');
+        timestampInfo.id = 'exchange-rate-timestamp';
+        timestampInfo.className = 'text-muted d-block';
+        exchangeRateDisplay.parentNode.parentNode.appendChild(timestampInfo);
+    }
+    timestampInfo.textContent = `Updated: ${timestamp}`;
+
+    const errorInfo = document.getElementById('exchange-rate-error');
+    if (errorInfo) {
+        errorInfo.remove();
+    }
+
+    // Keep an estimate already on screen in line with the new rate
+    if (previousRate !== exchangeRateDisplay.value && document.getElementById('quick-estimate')) {
+        showQuickEstimate();
+    }
+}
+
+function showExchangeRateFallback(error) {
+    const exchangeRateDisplay = document.getElementById('exchange_rate_display');
+    console.error('Error fetching exchange rate:', error);
+    exchangeRateDisplay.value = '1.1700 (fallback)';
+
+    let errorInfo = document.getElementById('exchange-rate-error');
+    if (!errorInfo) {
+        errorInfo = document.createElement('small');
+        errorInfo.id = 'exchange-rate-error';
+        errorInfo.className = 'text-warning d-block';
+        exchangeRateDisplay.parentNode.parentNode.appendChild(errorInfo);
+    }
+    errorInfo.innerHTML = '<i class="fas fa-exclamation-triangle"></i> Using fallback rate - verify current rate';
 }
 
 // Setup real-time calculation preview
 function setupRealTimeCalculation() {
-    const inputs = ['uk_price', 'co2_emissions', 'fuel_type', 'vehicle_age', 'import_origin'];
+    const inputs = ['uk_price', 'co2_emissions', 'fuel_type', 'vehicle_age', 'transport_method', 'import_origin'];
     let debounceTimer;
 
     inputs.forEach(inputId => {
@@ -301,56 +257,56 @@ function setupRealTimeCalculation() {
     });
 }
 
+// Landed cost from the generated tariff table - the same steps, in the same
+// order, as vrt_core.calculate_costs so the estimate matches the server
+function quickEstimate(ukPrice, co2Emissions, exchangeRate, vehicleAge = 0,
+                       transportMethod = 'ferry', importOrigin = 'uk') {
+    const tariff = VRT_TARIFF;
+    const vehicleValueEur = ukPrice * exchangeRate;
+
+    // Transport, transit insurance and customs clearance
+    const transport = tariff.transportCosts[transportMethod.toLowerCase()] ?? tariff.transportCosts.drive;
+    const transportTotal = transport + vehicleValueEur * tariff.transitInsuranceRate + tariff.customsClearance;
+    const omv = vehicleValueEur + transportTotal;
+
+    // Customs Duty (10% of vehicle value for UK, 0% for Northern Ireland)
+    const customsDuty = importOrigin.toLowerCase() === 'uk' ? vehicleValueEur * tariff.customsDutyRate : 0;
+
+    // VRT on OMV at the band rate, less age depreciation, never below the band minimum
+    const [, , vrtRate, vrtMinimum] = findVrtBand(co2Emissions);
+    let baseVrt = omv * (vrtRate / 100);
+    if (vehicleAge > 0) {
+        baseVrt = baseVrt * (1 - Math.min(vehicleAge * tariff.depreciationPerYear, tariff.maxDepreciation));
+    }
+    const finalVrt = Math.max(baseVrt, vrtMinimum);
+
+    // VAT (21% on vehicle + customs duty + VRT)
+    const vatAmount = (vehicleValueEur + customsDuty + finalVrt) * tariff.vatRate;
+
+    return {
+        omv: roundCents(omv),
+        customsDuty: roundCents(customsDuty),
+        vrt: roundCents(finalVrt),
+        vat: roundCents(vatAmount),
+        total: roundCents(omv + customsDuty + finalVrt + vatAmount + tariff.registrationFee)
+    };
+}
+
 // Show quick estimate without full calculation
 function showQuickEstimate() {
     const ukPrice = parseFloat(document.getElementById('uk_price').value);
     const co2Emissions = parseInt(document.getElementById('co2_emissions').value);
     const exchangeRate = parseFloat(document.getElementById('exchange_rate_display').value);
+    const vehicleAge = parseInt(document.getElementById('vehicle_age').value) || 0;
+    const transportMethod = document.getElementById('transport_method').value || 'ferry';
     const importOrigin = document.getElementById('import_origin').value;
 
     if (isNaN(ukPrice) || isNaN(co2Emissions) || isNaN(exchangeRate)) return;
 
-    // Quick calculation
-    const vehicleValueEur = ukPrice * exchangeRate;
-    const transportCosts = 350; // Rough estimate
-    const omv = vehicleValueEur + transportCosts;
-    
-    // Customs Duty (10% of vehicle value for UK, 0% for Northern Ireland)
-    const customsDuty = importOrigin === 'uk' ? vehicleValueEur * 0.10 : 0;
-    
-    // VRT calculation using official Irish Revenue rates
-    let vrtRate;
-    if (co2Emissions <= 50) vrtRate = 7;
-    else if (co2Emissions <= 80) vrtRate = 9;
-    else if (co2Emissions <= 85) vrtRate = 9.75;
-    else if (co2Emissions <= 90) vrtRate = 10.5;
-    else if (co2Emissions <= 95) vrtRate = 11.25;
-    else if (co2Emissions <= 100) vrtRate = 12;
-    else if (co2Emissions <= 105) vrtRate = 12.75;
-    else if (co2Emissions <= 110) vrtRate = 13.5;
-    else if (co2Emissions <= 115) vrtRate = 15.25;
-    else if (co2Emissions <= 120) vrtRate = 16;
-    else if (co2Emissions <= 125) vrtRate = 16.75;
-    else if (co2Emissions <= 130) vrtRate = 17.5;
-    else if (co2Emissions <= 135) vrtRate = 19.25;
-    else if (co2Emissions <= 140) vrtRate = 20;
-    else if (co2Emissions <= 145) vrtRate = 21.5;
-    else if (co2Emissions <= 150) vrtRate = 25;
-    else if (co2Emissions <= 155) vrtRate = 27.5;
-    else if (co2Emissions <= 170) vrtRate = 30;
-    else if (co2Emissions <= 190) vrtRate = 35;
-    else vrtRate = 41;
-
-    const estimatedVRT = omv * (vrtRate / 100);
-    
-    // VAT (21% on vehicle + customs duty + VRT)
-    const vatBase = vehicleValueEur + customsDuty + estimatedVRT;
-    const vatAmount = vatBase * 0.21;
-    
-    const totalEstimate = vehicleValueEur + transportCosts + customsDuty + estimatedVRT + vatAmount + 102;
+    const estimate = quickEstimate(ukPrice, co2Emissions, exchangeRate, vehicleAge, transportMethod, importOrigin);
 
     // Show quick estimate
-    showQuickEstimateDisplay(totalEstimate, estimatedVRT, customsDuty, vatAmount, importOrigin);
+    showQuickEstimateDisplay(estimate.total, estimate.vrt, estimate.customsDuty, estimate.vat, importOrigin);
 }
 
 // Display quick estimate
@@ -389,7 +345,7 @@ function showQuickEstimateDisplay(total, vrt, customsDuty, vat, importOrigin) {
         </div>
         <small class="text-muted">
             <i class="fas fa-info-circle"></i>
-            Rough estimate - click calculate for detailed breakdown
+            Estimate only - click calculate for detailed breakdown
         </small>
     `;
 }
@@ -0,0 +1,139 @@
+// Generated by vrt_core.py from the shared calculation core - do not edit.
+// Regenerate with: python3 vrt_core.py
+const VRT_TARIFF = {
+    "version": "e5bbee9a8a02",
+    "co2Bands": [
+        [
+            0,
+            50,
+            7,
+            140
+        ],
+        [
+            51,
+            80,
+            9,
+            180
+        ],
+        [
+            81,
+            85,
+            9.75,
+            195
+        ],
+        [
+            86,
+            90,
+            10.5,
+            210
+        ],
+        [
+            91,
+            95,
+            11.25,
+            225
+        ],
+        [
+            96,
+            100,
+            12,
+            240
+        ],
+        [
+            101,
+            105,
+            12.75,
+            255
+        ],
+        [
+            106,
+            110,
+            13.5,
+            270
+        ],
+        [
+            111,
+            115,
+            15.25,
+            305
+        ],
+        [
+            116,
+            120,
+            16,
+            320
+        ],
+        [
+            121,
+            125,
+            16.75,
+            335
+        ],
+        [
+            126,
+            130,
+            17.5,
+            350
+        ],
+        [
+            131,
+            135,
+            19.25,
+            385
+        ],
+        [
+            136,
+            140,
+            20,
+            400
+        ],
+        [
+            141,
+            145,
+            21.5,
+            430
+        ],
+        [
+            146,
+            150,
+            25,
+            500
+        ],
+        [
+            151,
+            155,
+            27.5,
+            550
+        ],
+        [
+            156,
+            170,
+            30,
+            600
+        ],
+        [
+            171,
+            190,
+            35,
+            700
+        ],
+        [
+            191,
+            null,
+            41,
+            820
+        ]
+    ],
+    "customsDutyRate": 0.1,
+    "vatRate": 0.21,
+    "registrationFee": 102,
+    "transportCosts": {
+        "ferry": 300,
+        "drive": 150
+    },
+    "transitInsuranceRate": 0.015,
+    "customsClearance": 50,
+    "depreciationPerYear": 0.02,
+    "maxDepreciation": 0.1,
+    "fallbackExchangeRate": 1.17
+};
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Static asset pipeline for the VRT Calculator
+`python3 static_assets.py` copies the static files to content-hashed names under
+static/dist with gzip and brotli variants; the app then links the hashed names
+and serves them with long-lived immutable caching
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+
+from flask import request, send_file, url_for
+
+try:
+    import brotli
+except ImportError:  # Brotli variants are skipped when the package isn't installed
+    brotli = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_PATH = os.path.join(DIST_DIR, 'manifest.json')
+
+# Source files, relative to static/
+ASSET_DIRS = ('css', 'js', 'images')
+
+# Already-compressed formats gain nothing from gzip/brotli
+PRECOMPRESS_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt', '.html')
+
+# Encodings in order of preference: (Accept-Encoding token, file suffix)
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def _hashed_name(relative_path: str, content: bytes) -> str:
+    root, ext = os.path.splitext(relative_path)
+    return f"{root}.{hashlib.sha256(content).hexdigest()[:12]}{ext}"
+
+
+def build_assets() -> dict:
+    """Write hashed copies and compressed variants of every asset - returns the manifest"""
+    if os.path.isdir(DIST_DIR):
+        shutil.rmtree(DIST_DIR)
+
+    manifest = {}
+    for asset_dir in ASSET_DIRS:
+        for dirpath, _, filenames in os.walk(os.path.join(STATIC_DIR, asset_dir)):
+            for filename in sorted(filenames):
+                source = os.path.join(dirpath, filename)
+                relative_path = os.path.relpath(source, STATIC_DIR).replace(os.sep, '/')
+                with open(source, 'rb') as f:
+                    content = f.read()
+
+                hashed = _hashed_name(relative_path, content)
+                target = os.path.join(DIST_DIR, hashed)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with open(target, 'wb') as f:
+                    f.write(content)
+
+                if filename.endswith(PRECOMPRESS_EXTENSIONS):
+                    with open(target + '.gz', 'wb') as f:
+                        f.write(gzip.compress(content, compresslevel=9, mtime=0))
+                    if brotli is not None:
+                        with open(target + '.br', 'wb') as f:
+                            f.write(brotli.compress(content, quality=11))
+
+                manifest[relative_path] = hashed
+
+    with open(MANIFEST_PATH, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest() -> dict:
+    """Manifest from the last build, or empty when assets haven't been built"""
+    try:
+        with open(MANIFEST_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def init_app(flask_app):
+    """Register the asset_url template helper and the /assets route"""
+    manifest = load_manifest()
+    hashed_names = set(manifest.values())
+
+    def asset_url(filename):
+        """URL for a static file - the content-hashed copy when assets have been built"""
+        hashed = manifest.get(filename)
+        if hashed is None:
+            return url_for('static', filename=filename)
+        return url_for('hashed_asset', filename=hashed)
+
+    flask_app.jinja_env.globals['asset_url'] = asset_url
+
+    @flask_app.route('/assets/<path:filename>')
+    def hashed_asset(filename):
+        """Serve a hashed asset, precompressed where the client accepts it"""
+        if filename not in hashed_names:
+            return 'Not found', 404
+
+        path = os.path.join(DIST_DIR, filename)
+        accepted = request.accept_encodings
+        encoding = None
+        for token, suffix in ENCODINGS:
+            if accepted[token] and os.path.exists(path + suffix):
+                path, encoding = path + suffix, token
+                break
+
+        # Mimetype comes from the original name, not the .br/.gz suffix
+        response = send_file(path, mimetype=mimetypes.guess_type(filename)[0],
+                             conditional=True, max_age=31536000)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+    return asset_url
+
+
+def main():
+    manifest = build_assets()
+    total = sum(os.path.getsize(os.path.join(DIST_DIR, name)) for name in manifest.values())
+    print(f"Built {len(manifest)} assets ({total:,} bytes) into {DIST_DIR}")
+    if brotli is None:
+        print("Brotli not installed - only gzip variants were written (pip3 install brotli)")
+    for source, hashed in sorted(manifest.items()):
+        print(f"  {source} -> {hashed}")
+
+
+if __name__ == "__main__":
+    main()
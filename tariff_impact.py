@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Tariff change impact analysis for the VRT calculator
+Prices a whole fleet under the current CO2 bands and a proposed set in one
+vectorised pass, and reports per-vehicle and per-band differences in VRT, VAT
+and total landed cost
+"""
+
+import argparse
+import csv
+import json
+import sys
+from typing import Dict, List
+
+import numpy as np
+
+import vrt_core
+from batch_calculator import (FUEL_TYPES, ORIGINS, TRANSPORT_METHODS, band_labels, calculate_batch,
+                              fleet_exchange_rates, load_co2_bands, lookup_bands, read_fleet_columns)
+
+# Result fields compared between the two tariffs
+IMPACT_FIELDS = ('final_vrt', 'vat_amount', 'total_import_cost')
+
+
+def tariff_version(co2_bands) -> str:
+    """Short hash of a band table, matching VRTCalculatorWeb.get_tariff_version"""
+    return vrt_core.BandTable(co2_bands).version
+
+
+def compare_tariffs(current_bands, proposed_bands, fleet: Dict[str, np.ndarray],
+                    exchange_rate: float, snapshot=None) -> Dict[str, np.ndarray]:
+    """
+    Per-vehicle impact of moving from current_bands to proposed_bands
+    fleet holds the columns from read_fleet_columns(); exchange_rate is the GBP rate
+    and other source currencies use the rate snapshot (see fleet_exchange_rates).
+    Returns the current, proposed and delta value of each IMPACT_FIELDS entry plus
+    both band indexes
+    """
+    rates = fleet_exchange_rates(fleet, exchange_rate, snapshot)
+    inputs = (fleet['purchase_price'], fleet['co2_emissions'], rates, fleet['fuel_type'],
+              fleet['vehicle_age_years'], fleet['transport_method'], fleet['import_origin'])
+    current = calculate_batch(current_bands, *inputs)
+    proposed = calculate_batch(proposed_bands, *inputs)
+
+    impact = {
+        'purchase_price': fleet['purchase_price'],
+        'co2_emissions': fleet['co2_emissions'],
+        'fuel_type': fleet['fuel_type'],
+        'vehicle_age_years': fleet['vehicle_age_years'],
+        'transport_method': fleet['transport_method'],
+        'import_origin': fleet['import_origin'],
+        'source_currency': fleet['currencies'][fleet['source_currency']],
+        'exchange_rate': rates,
+        'current_band': lookup_bands(fleet['co2_emissions'], current_bands)['band_index'],
+        'proposed_band': lookup_bands(fleet['co2_emissions'], proposed_bands)['band_index'],
+        'current_rate_percent': current['co2_rate_percent'],
+        'proposed_rate_percent': proposed['co2_rate_percent']
+    }
+    for field in IMPACT_FIELDS:
+        impact[f'current_{field}'] = current[field]
+        impact[f'proposed_{field}'] = proposed[field]
+        impact[f'delta_{field}'] = (proposed[field] - current[field]).round(2)
+    return impact
+
+
+def _band_breakdown(band_index: np.ndarray, labels: List[str], impact: Dict[str, np.ndarray]) -> List[Dict]:
+    """Vehicle counts and summed deltas per band (bincount, so one pass per field)"""
+    size = len(labels)
+    counts = np.bincount(band_index, minlength=size)
+    sums = {field: np.bincount(band_index, weights=impact[f'delta_{field}'], minlength=size)
+            for field in IMPACT_FIELDS}
+    current_totals = np.bincount(band_index, weights=impact['current_total_import_cost'], minlength=size)
+
+    breakdown = []
+    for band, label in enumerate(labels):
+        if not counts[band]:
+            continue
+        row = {'band': label, 'vehicles': int(counts[band])}
+        for field in IMPACT_FIELDS:
+            row[f'delta_{field}'] = round(float(sums[field][band]), 2)
+        row['mean_delta_total_import_cost'] = round(float(sums['total_import_cost'][band] / counts[band]), 2)
+        row['delta_percent'] = (round(float(sums['total_import_cost'][band] / current_totals[band] * 100), 3)
+                                if current_totals[band] else 0.0)
+        breakdown.append(row)
+    return breakdown
+
+
+def summarize_impact(impact: Dict[str, np.ndarray], current_bands, proposed_bands) -> Dict:
+    """Fleet totals, winners and losers, and per-band breakdowns for both band tables"""
+    delta = impact['delta_total_import_cost']
+    totals = {}
+    for field in IMPACT_FIELDS:
+        current_total = float(impact[f'current_{field}'].sum())
+        proposed_total = float(impact[f'proposed_{field}'].sum())
+        totals[field] = {
+            'current': round(current_total, 2),
+            'proposed': round(proposed_total, 2),
+            'delta': round(proposed_total - current_total, 2)
+        }
+
+    return {
+        'current_tariff_version': tariff_version(current_bands),
+        'proposed_tariff_version': tariff_version(proposed_bands),
+        'vehicles': len(delta),
+        'totals': totals,
+        'vehicles_paying_more': int((delta > 0).sum()),
+        'vehicles_paying_less': int((delta < 0).sum()),
+        'vehicles_unchanged': int((delta == 0).sum()),
+        'mean_delta_total_import_cost': round(float(delta.mean()), 2) if len(delta) else 0.0,
+        # 0 when nobody pays more (or less), as in repricing's RepricingSummary
+        'largest_increase': round(max(float(delta.max()), 0.0), 2) if len(delta) else 0.0,
+        'largest_decrease': round(min(float(delta.min()), 0.0), 2) if len(delta) else 0.0,
+        'vehicles_changing_band': int((impact['current_band'] != impact['proposed_band']).sum()),
+        'by_current_band': _band_breakdown(impact['current_band'], band_labels(current_bands), impact),
+        'by_proposed_band': _band_breakdown(impact['proposed_band'], band_labels(proposed_bands), impact)
+    }
+
+
+def analyze_fleet(current_bands, proposed_bands, fleet_source, exchange_rate: float, snapshot=None):
+    """Read a fleet CSV (path or open text file) and return (per-vehicle impact, summary)"""
+    impact = compare_tariffs(current_bands, proposed_bands, read_fleet_columns(fleet_source),
+                             exchange_rate, snapshot)
+    return impact, summarize_impact(impact, current_bands, proposed_bands)
+
+
+def write_impact_csv(impact: Dict[str, np.ndarray], f, current_bands, proposed_bands):
+    """Per-vehicle impact as CSV to an open text file, with codes and band indexes written as labels"""
+    current_labels, proposed_labels = band_labels(current_bands), band_labels(proposed_bands)
+    labels = {
+        'fuel_type': FUEL_TYPES, 'transport_method': TRANSPORT_METHODS, 'import_origin': ORIGINS,
+        'current_band': current_labels, 'proposed_band': proposed_labels
+    }
+    names = list(impact)
+    columns = [np.asarray(labels[name], dtype=object)[impact[name]].tolist() if name in labels
+               else impact[name].tolist() for name in names]
+    writer = csv.writer(f)
+    writer.writerow(names)
+    writer.writerows(zip(*columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare a proposed CO2 band table with the current one")
+    parser.add_argument('fleet_csv', help="Fleet file (same columns as fleet_analytics.py)")
+    parser.add_argument('proposed_bands', help="Proposed CO2 bands (JSON, see batch_calculator.load_co2_bands)")
+    parser.add_argument('--current-bands', help="Compare against this band table instead of the calculator's")
+    parser.add_argument('--exchange-rate', type=float,
+                        help="GBP to EUR rate (default: current rate); other source currencies use current rates")
+    parser.add_argument('--output', help="Write per-vehicle impact (.csv, or .arrow/.parquet with pyarrow)")
+    args = parser.parse_args()
+    if args.exchange_rate is not None and not 0 < args.exchange_rate < float('inf'):
+        parser.error("--exchange-rate must be a positive number")
+
+    from app import VRTCalculatorWeb
+    calculator = VRTCalculatorWeb()
+    current_bands = load_co2_bands(args.current_bands) if args.current_bands else calculator.co2_bands
+    proposed_bands = load_co2_bands(args.proposed_bands)
+    exchange_rate = args.exchange_rate if args.exchange_rate is not None else calculator.get_current_exchange_rate()
+
+    try:
+        impact, summary = analyze_fleet(current_bands, proposed_bands, args.fleet_csv, exchange_rate,
+                                        calculator.get_rate_snapshot())
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    if args.output:
+        if args.output.endswith(('.arrow', '.parquet')):
+            from columnar_export import write_columns
+            write_columns(impact, args.output, 'parquet' if args.output.endswith('.parquet') else 'ipc')
+        else:
+            with open(args.output, 'w', newline='') as f:
+                write_impact_csv(impact, f, current_bands, proposed_bands)
+
+    json.dump(summary, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
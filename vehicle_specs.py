@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Local vehicle specification database
+Maps make/model/variant/year to CO2 emissions, fuel type and engine size using
+the bundled data/vehicle_specs.csv and a memory-mapped on-disk index
+"""
+
+import csv
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+from typing import Dict, List, Optional
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+SPECS_CSV = os.path.join(DATA_DIR, 'vehicle_specs.csv')
+SPECS_INDEX = os.path.join(DATA_DIR, 'vehicle_specs.idx')
+
+# Index layout: a header followed by fixed-width records sorted by key, so the
+# index can be binary searched straight out of the mapped file
+INDEX_MAGIC = b'VRTSPEC1'
+HEADER = struct.Struct('<8sII')  # magic, record count, record size
+RECORD = struct.Struct('<96s20s28s32sHHHB')  # key, make, model, variant, year, co2, engine_cc, fuel
+KEY_SIZE = 96
+
+FUEL_TYPES = ('petrol', 'diesel', 'hybrid', 'electric')
+
+
+def normalize_key(*parts) -> str:
+    """Lookup key for a vehicle: lower case, single spaced ('volkswagen golf 1.5 tsi 130 life 2021')"""
+    return re.sub(r'\s+', ' ', ' '.join(str(p) for p in parts if p is not None and p != '')).strip().lower()
+
+
+def _encode(value: str, size: int) -> bytes:
+    encoded = value.encode('utf-8')
+    if len(encoded) > size:
+        raise ValueError(f"Value too long for index field ({size} bytes): {value!r}")
+    return encoded
+
+
+def build_index(csv_path: str = SPECS_CSV, index_path: str = SPECS_INDEX) -> int:
+    """Build the sorted on-disk index from the spec CSV - returns the record count"""
+    records = []
+    with open(csv_path, newline='') as f:
+        for row in csv.DictReader(f):
+            key = normalize_key(row['make'], row['model'], row['variant'], row['year'])
+            records.append((
+                _encode(key, KEY_SIZE),
+                _encode(row['make'], 20),
+                _encode(row['model'], 28),
+                _encode(row['variant'], 32),
+                int(row['year']),
+                int(row['co2_emissions']),
+                int(row['engine_cc'] or 0),
+                FUEL_TYPES.index(row['fuel_type'].lower())
+            ))
+    # Byte order of the padded keys matches the order used when searching
+    records.sort(key=lambda record: record[0])
+
+    tmp_path = index_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(INDEX_MAGIC, len(records), RECORD.size))
+        for record in records:
+            f.write(RECORD.pack(*record))
+    os.replace(tmp_path, index_path)
+    return len(records)
+
+
+class VehicleSpecIndex:
+    """
+    Read-only view of the spec index
+    Opening maps the file without parsing it; lookups decode only the records they touch
+    """
+
+    def __init__(self, index_path: str = SPECS_INDEX):
+        self.index_path = index_path
+        with open(index_path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, record_size = HEADER.unpack_from(self._mmap, 0)
+        if magic != INDEX_MAGIC or record_size != RECORD.size:
+            raise ValueError(f"Unrecognised vehicle spec index: {index_path}")
+
+    def __len__(self):
+        return self.count
+
+    def _offset(self, position: int) -> int:
+        return HEADER.size + position * RECORD.size
+
+    def _key_at(self, position: int) -> bytes:
+        offset = self._offset(position)
+        return self._mmap[offset:offset + KEY_SIZE].rstrip(b'\0')
+
+    def _record_at(self, position: int) -> Dict:
+        key, make, model, variant, year, co2, engine_cc, fuel = RECORD.unpack_from(
+            self._mmap, self._offset(position))
+        make = make.rstrip(b'\0').decode('utf-8')
+        model = model.rstrip(b'\0').decode('utf-8')
+        variant = variant.rstrip(b'\0').decode('utf-8')
+        return {
+            'key': key.rstrip(b'\0').decode('utf-8'),
+            'label': f"{make} {model} {variant} ({year})",
+            'make': make,
+            'model': model,
+            'variant': variant,
+            'year_of_manufacture': year,
+            'co2_emissions': co2,
+            'fuel_type': FUEL_TYPES[fuel],
+            'engine_capacity': engine_cc
+        }
+
+    def _lower_bound(self, target: bytes) -> int:
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            if self._key_at(mid) < target:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def lookup(self, key: str) -> Optional[Dict]:
+        """Exact lookup by normalized make/model/variant/year key"""
+        target = normalize_key(key).encode('utf-8')
+        position = self._lower_bound(target)
+        if position < self.count and self._key_at(position) == target:
+            return self._record_at(position)
+        return None
+
+    def autocomplete(self, prefix: str, limit: int = 10) -> List[Dict]:
+        """Vehicles whose key starts with prefix, in key order"""
+        target = normalize_key(prefix).encode('utf-8')
+        if not target:
+            return []
+        matches = []
+        position = self._lower_bound(target)
+        while position < self.count and len(matches) < limit:
+            if not self._key_at(position).startswith(target):
+                break
+            record = self._record_at(position)
+            matches.append({'key': record['key'], 'label': record['label']})
+            position += 1
+        return matches
+
+
+_spec_index = None
+_spec_index_lock = threading.Lock()
+
+
+def get_spec_index() -> VehicleSpecIndex:
+    """Open the bundled spec index, (re)building it first if the CSV is newer"""
+    global _spec_index
+
+    with _spec_index_lock:
+        if _spec_index is None:
+            if (not os.path.exists(SPECS_INDEX) or
+                    os.path.getmtime(SPECS_INDEX) < os.path.getmtime(SPECS_CSV)):
+                build_index()
+            _spec_index = VehicleSpecIndex()
+        return _spec_index
+
+
+def lookup_vehicle_spec(key: str) -> Optional[Dict]:
+    """Look up a vehicle in the bundled database by make/model/variant/year"""
+    try:
+        return get_spec_index().lookup(key)
+    except (OSError, ValueError):
+        return None
+
+
+def main():
+    if len(sys.argv) >= 2 and sys.argv[1] == 'build':
+        count = build_index()
+        print(f"Indexed {count} vehicles into {SPECS_INDEX}")
+    elif len(sys.argv) >= 3 and sys.argv[1] == 'search':
+        for match in get_spec_index().autocomplete(' '.join(sys.argv[2:])):
+            print(match['label'])
+    else:
+        print("Usage: python3 vehicle_specs.py build | search <prefix>")
+
+
+if __name__ == "__main__":
+    main()
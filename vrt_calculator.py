@@ -4,118 +4,87 @@ VRT (Vehicle Registration Tax) Calculator for importing cars from UK to Ireland
 Note: This is a basic framework - always verify current rates with Irish Revenue
 """
 
-import requests
-import json
 from datetime import datetime
 from typing import Dict, Optional, Tuple
 
+import vrt_core
+from history_store import HistoryStore
+from vehicle_specs import lookup_vehicle_spec
+
 class VRTCalculator:
     def __init__(self):
-        # Official VRT rates from Irish Revenue (Category A) - 2024
+        # Official VRT rates from Irish Revenue (Category A), shared with every calculator
         # Format: (min_co2, max_co2, rate_percent, minimum_amount_eur)
-        self.co2_bands = [
-            (0, 50, 7, 140),
-            (51, 80, 9, 180),
-            (81, 85, 9.75, 195),
-            (86, 90, 10.5, 210),
-            (91, 95, 11.25, 225),
-            (96, 100, 12, 240),
-            (101, 105, 12.75, 255),
-            (106, 110, 13.5, 270),
-            (111, 115, 15.25, 305),
-            (116, 120, 16, 320),
-            (121, 125, 16.75, 335),
-            (126, 130, 17.5, 350),
-            (131, 135, 19.25, 385),
-            (136, 140, 20, 400),
-            (141, 145, 21.5, 430),
-            (146, 150, 25, 500),
-            (151, 155, 27.5, 550),
-            (156, 170, 30, 600),
-            (171, 190, 35, 700),
-            (191, float('inf'), 41, 820)
-        ]
+        self.co2_bands = list(vrt_core.CO2_BANDS)
+        self._band_table = vrt_core.BandTable(self.co2_bands)
     
-    def get_omv_from_uk_price(self, uk_price_gbp: float, exchange_rate: float = None) -> float:
+    def get_omv_from_uk_price(self, uk_price_gbp: float, exchange_rate: float = None,
+                              transport_method: str = 'ferry') -> float:
         """
         Calculate Open Market Value (OMV) from UK purchase price
         OMV = UK price converted to EUR + estimated transport/insurance costs
         """
         if exchange_rate is None:
             # You could integrate with a currency API here
-            exchange_rate = 1.17  # Example rate - GET CURRENT RATE
+            exchange_rate = vrt_core.FALLBACK_EXCHANGE_RATE  # Example rate - GET CURRENT RATE
         
         # Convert to EUR
         price_eur = uk_price_gbp * exchange_rate
         
-        # Add estimated transport and insurance (typically 3-5% of value)
-        transport_insurance = price_eur * 0.04  # 4% estimate
-        
-        omv = price_eur + transport_insurance
-        return round(omv, 2)
+        # Add estimated transport, transit insurance and customs clearance
+        return price_eur + vrt_core.transport_costs(price_eur, transport_method)['total']
     
     def get_co2_rate_and_minimum(self, co2_emissions: int) -> Tuple[float, int]:
         """Get VRT percentage rate and minimum amount based on CO2 emissions"""
-        for min_co2, max_co2, rate, minimum in self.co2_bands:
-            if min_co2 <= co2_emissions <= max_co2:
-                return rate, minimum
-        return 41, 820  # Default to highest rate
+        if self._band_table.co2_bands != tuple(self.co2_bands):
+            self._band_table = vrt_core.BandTable(self.co2_bands)
+        return self._band_table.rate_and_minimum(co2_emissions)
     
     def calculate_vrt(self, 
                      omv: float, 
                      co2_emissions: int, 
                      fuel_type: str,
                      vehicle_age_years: int = 0,
-                     vehicle_value_eur: float = 0) -> Dict:
+                     vehicle_value_eur: float = 0,
+                     import_origin: str = 'uk') -> Dict:
         """
         Calculate VRT and all import costs including Customs Duty and VAT
         """
         # Get CO2 rate and minimum
         co2_rate, vrt_minimum = self.get_co2_rate_and_minimum(co2_emissions)
         
-        # Calculate base VRT
-        base_vrt = omv * (co2_rate / 100)
-        
-        # Apply age-related depreciation (if applicable)
-        if vehicle_age_years > 0:
-            # Depreciation rates vary - this is simplified
-            depreciation_rate = min(vehicle_age_years * 0.02, 0.1)  # Max 10%
-            base_vrt = base_vrt * (1 - depreciation_rate)
-        
-        # Apply minimum VRT (whichever is greater)
-        final_vrt = max(base_vrt, vrt_minimum)
-        
-        # Calculate Customs Duty (10% of vehicle value)
-        customs_duty = vehicle_value_eur * 0.10
-        
-        # Calculate VAT (21% on vehicle value + customs duty + VRT)
-        vat_base = vehicle_value_eur + customs_duty + final_vrt
-        vat_amount = vat_base * 0.21
+        # Customs duty, VRT (with age depreciation and minimum) and VAT from the shared core
+        costs = vrt_core.price_from_omv(omv, vehicle_value_eur, co2_rate, vrt_minimum,
+                                        vehicle_age_years, import_origin)
         
         return {
-            'omv': omv,
+            'omv': vrt_core.round_cents(omv),
             'co2_emissions': co2_emissions,
             'co2_rate_percent': co2_rate,
             'fuel_type': fuel_type,
             'vehicle_age_years': vehicle_age_years,
-            'base_vrt': round(base_vrt, 2),
+            'import_origin': import_origin,
+            'base_vrt': vrt_core.round_cents(costs['base_vrt']),
             'minimum_vrt': vrt_minimum,
-            'final_vrt': round(final_vrt, 2),
-            'customs_duty': round(customs_duty, 2),
-            'vat_base': round(vat_base, 2),
-            'vat_amount': round(vat_amount, 2),
-            'total_import_cost': round(vehicle_value_eur + customs_duty + final_vrt + vat_amount + 102, 2),
+            'final_vrt': vrt_core.round_cents(costs['final_vrt']),
+            'customs_duty': vrt_core.round_cents(costs['customs_duty']),
+            'vat_base': vrt_core.round_cents(costs['vat_base']),
+            'vat_amount': vrt_core.round_cents(costs['vat_amount']),
+            'total_import_cost': vrt_core.round_cents(costs['total_import_cost']),
             'calculation_date': datetime.now().isoformat()
         }
     
     def lookup_vehicle_specs(self, registration: str) -> Optional[Dict]:
         """
-        Placeholder for vehicle lookup by registration
-        You could integrate with DVLA API or similar service
+        Look up vehicle specs in the bundled spec database
+        Accepts a make/model/variant/year key (e.g. 'Volkswagen Golf 1.5 TSI 130 Life 2021');
+        registration plates need a DVLA or similar API integration
         """
-        # This would need to integrate with a vehicle data API
-        # For now, return None - user must provide specs manually
-        print(f"Vehicle lookup for {registration} not implemented")
+        specs = lookup_vehicle_spec(registration)
+        if specs:
+            return specs
+        
+        print(f"No vehicle specs found for {registration}")
         print("Please provide CO2 emissions and fuel type manually")
         return None
 
@@ -133,22 +102,22 @@ def main():
         co2_emissions = int(input("Enter CO2 emissions (g/km): "))
         fuel_type = input("Enter fuel type (petrol/diesel/electric/hybrid): ")
         vehicle_age = int(input("Enter vehicle age in years (0 for new): "))
+        import_origin = input("Import origin (uk/ni) [uk]: ").strip().lower() or 'uk'
+        transport_method = input("Transport method (ferry/drive) [ferry]: ").strip().lower() or 'ferry'
         
         # Optional: Get current exchange rate
         exchange_rate_input = input("Enter GBP to EUR exchange rate (press Enter for default): ")
         exchange_rate = float(exchange_rate_input) if exchange_rate_input else None
         
         # Calculate OMV
-        omv = calculator.get_omv_from_uk_price(uk_price, exchange_rate)
+        omv = calculator.get_omv_from_uk_price(uk_price, exchange_rate, transport_method)
         
         # Get vehicle value in EUR for customs duty calculation
-        if exchange_rate_input:
-            vehicle_value_eur = uk_price * float(exchange_rate_input)
-        else:
-            vehicle_value_eur = uk_price * 1.17  # Default rate
+        vehicle_value_eur = uk_price * (exchange_rate or vrt_core.FALLBACK_EXCHANGE_RATE)
         
         # Calculate VRT and all import costs
-        result = calculator.calculate_vrt(omv, co2_emissions, fuel_type, vehicle_age, vehicle_value_eur)
+        result = calculator.calculate_vrt(omv, co2_emissions, fuel_type, vehicle_age, vehicle_value_eur,
+                                          import_origin)
         
         # Display results
         print("\n" + "=" * 60)
@@ -165,7 +134,8 @@ def main():
         print(f"Minimum VRT: €{result['minimum_vrt']:,.2f}")
         print(f"FINAL VRT: €{result['final_vrt']:,.2f}")
         print()
-        print(f"Customs Duty (10%): €{result['customs_duty']:,.2f}")
+        duty_label = "10%" if import_origin == 'uk' else "not applicable from NI"
+        print(f"Customs Duty ({duty_label}): €{result['customs_duty']:,.2f}")
         print(f"VAT Base: €{result['vat_base']:,.2f}")
         print(f"VAT Amount (21%): €{result['vat_amount']:,.2f}")
         print()
@@ -180,18 +150,18 @@ def main():
         print("- Vehicle modifications (if required)")
         print()
         print("IMPORTANT NOTES:")
-        print("- Customs Duty: 10% of vehicle purchase price")
+        print("- Customs Duty: 10% of vehicle purchase price (UK imports only)")
         print("- VAT: 21% on vehicle + customs duty + VRT")
         print("- VRT: Based on CO2 emissions and OMV")
         print("- All rates subject to change - verify with Irish Revenue")
         
         # Save results to file
-        save_file = input("\nSave results to file? (y/n): ")
+        save_file = input("\nSave results to history? (y/n): ")
         if save_file.lower() == 'y':
-            filename = f"vrt_calculation_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            with open(filename, 'w') as f:
-                json.dump(result, f, indent=2)
-            print(f"Results saved to {filename}")
+            store = HistoryStore(fsync='always')
+            store.append(result)
+            store.flush()
+            print(f"Results saved to {store.path} (view with: python3 history_store.py last)")
     
     except ValueError as e:
         print(f"Error: Invalid input - {e}")
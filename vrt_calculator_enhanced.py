@@ -4,198 +4,105 @@ Enhanced VRT Calculator with API integration capabilities
 Includes currency conversion and vehicle data lookup features
 """
 
-import requests
-import json
 from datetime import datetime
 from typing import Dict, Optional, Tuple
 import os
 
+import vrt_core
+from exchange_rates import get_rate_snapshot
+from history_store import HistoryStore
+from vehicle_specs import get_spec_index, lookup_vehicle_spec
+
 class EnhancedVRTCalculator:
     def __init__(self, api_key: Optional[str] = None):
         self.api_key = api_key or os.getenv('EXCHANGE_API_KEY')
         
-        # VRT rates - ALWAYS VERIFY WITH CURRENT IRISH REVENUE RATES
-        self.co2_bands = {
-            (0, 120): 14,
-            (121, 140): 16,
-            (141, 155): 20,
-            (156, 170): 24,
-            (171, 190): 28,
-            (191, 225): 32,
-            (226, float('inf')): 36
-        }
-        
-        self.minimum_vrt = {
-            'petrol': 125,
-            'diesel': 200,
-            'electric': 0,
-            'hybrid': 125
-        }
+        # VRT rates from the shared core - ALWAYS VERIFY WITH CURRENT IRISH REVENUE RATES
+        # Format: (min_co2, max_co2, rate_percent, minimum_amount_eur)
+        self.co2_bands = list(vrt_core.CO2_BANDS)
+        self._band_table = vrt_core.BandTable(self.co2_bands)
     
     def get_current_exchange_rate(self) -> Optional[float]:
         """
-        Get current GBP to EUR exchange rate from API
-        You can use services like exchangerate-api.com, fixer.io, etc.
+        Get current GBP to EUR exchange rate from the shared rate snapshot
+        Returns None when the rate API is unavailable and only the fallback rate is known
         """
-        try:
-            # Example using exchangerate-api.com (free tier available)
-            url = "https://api.exchangerate-api.com/v4/latest/GBP"
-            response = requests.get(url, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                eur_rate = data['rates'].get('EUR')
-                if eur_rate:
-                    print(f"Current exchange rate: 1 GBP = {eur_rate:.4f} EUR")
-                    return eur_rate
-        except Exception as e:
-            print(f"Could not fetch exchange rate: {e}")
-        
-        return None
+        snapshot = get_rate_snapshot()
+        if snapshot.is_fallback:
+            print("Could not fetch exchange rate")
+            return None
+        
+        eur_rate = snapshot.rate('GBP', 'EUR')
+        print(f"Current exchange rate: 1 GBP = {eur_rate:.4f} EUR")
+        return eur_rate
     
     def lookup_vehicle_by_reg(self, registration: str) -> Optional[Dict]:
         """
-        Lookup vehicle details by UK registration
-        This would require integration with DVLA API or similar service
+        Lookup vehicle details in the bundled spec database
+        Accepts a make/model/variant/year key (e.g. 'Toyota Corolla 1.8 Hybrid 2020');
+        UK registration plates would need DVLA API or similar integration
         """
-        # Placeholder - would need actual API integration
-        # DVLA provides some vehicle data APIs
-        print(f"Vehicle lookup for {registration} - API integration needed")
-        
-        # Example of what this might return:
-        example_data = {
-            'registration': registration,
-            'make': 'Example Make',
-            'model': 'Example Model',
-            'fuel_type': 'Petrol',
-            'co2_emissions': 150,
-            'year_of_manufacture': 2020,
-            'engine_capacity': 2000
-        }
+        specs = lookup_vehicle_spec(registration)
+        if specs:
+            specs['registration'] = registration
+            return specs
         
-        return None  # Return None until real API is integrated
+        print(f"Vehicle lookup for {registration} - not found in local spec database")
+        return None
     
     def estimate_transport_costs(self, vehicle_value: float, 
                                transport_method: str = 'ferry') -> Dict:
         """
         Estimate transport and associated costs
         """
-        costs = {
-            'transport': 0,
-            'insurance': 0,
-            'customs_clearance': 0,
-            'total': 0
-        }
-        
-        if transport_method.lower() == 'ferry':
-            # Ferry costs typically £200-400 depending on route and vehicle size
-            costs['transport'] = 300
-        elif transport_method.lower() == 'drive':
-            # Fuel, tolls, accommodation if needed
-            costs['transport'] = 150
-        
-        # Transit insurance (typically 1-2% of vehicle value)
-        costs['insurance'] = vehicle_value * 0.015
-        
-        # Customs clearance fees
-        costs['customs_clearance'] = 50
-        
-        costs['total'] = sum(costs.values())
-        
-        return costs
+        return vrt_core.transport_costs(vehicle_value, transport_method)
     
     def calculate_comprehensive_costs(self, 
                                     uk_price_gbp: float,
                                     co2_emissions: int,
                                     fuel_type: str,
                                     vehicle_age_years: int = 0,
-                                    transport_method: str = 'ferry') -> Dict:
+                                    transport_method: str = 'ferry',
+                                    import_origin: str = 'uk',
+                                    exchange_rate: Optional[float] = None) -> Dict:
         """
         Calculate all costs associated with importing a vehicle
+        Same result layout as the web calculator, including customs duty and VAT
         """
         # Get current exchange rate
-        exchange_rate = self.get_current_exchange_rate()
+        if exchange_rate is None:
+            exchange_rate = self.get_current_exchange_rate()
         if not exchange_rate:
-            exchange_rate = 1.17  # Fallback rate
+            exchange_rate = vrt_core.FALLBACK_EXCHANGE_RATE
             print("Using fallback exchange rate - verify current rate!")
         
         # Convert UK price to EUR
         vehicle_value_eur = uk_price_gbp * exchange_rate
         
-        # Calculate transport costs
-        transport_costs = self.estimate_transport_costs(vehicle_value_eur, transport_method)
-        
-        # Calculate OMV (Open Market Value)
-        omv = vehicle_value_eur + transport_costs['total']
-        
-        # Calculate VRT
-        co2_rate = self.get_co2_rate(co2_emissions)
-        base_vrt = omv * (co2_rate / 100)
-        
-        # Apply age depreciation if applicable
-        if vehicle_age_years > 0:
-            depreciation_rate = min(vehicle_age_years * 0.02, 0.1)
-            base_vrt = base_vrt * (1 - depreciation_rate)
-        
-        # Apply minimum VRT
-        minimum = self.minimum_vrt.get(fuel_type.lower(), 125)
-        final_vrt = max(base_vrt, minimum)
-        
-        # Calculate motor tax (simplified - actual rates vary by CO2 and year)
-        motor_tax = self.estimate_motor_tax(co2_emissions, fuel_type)
+        # Transport, OMV, customs duty, VRT, VAT and motor tax from the shared core
+        costs = vrt_core.calculate_costs(vehicle_value_eur, co2_emissions, fuel_type, vehicle_age_years,
+                                         transport_method, import_origin, self._bands())
         
-        return {
-            'purchase_details': {
-                'uk_price_gbp': uk_price_gbp,
-                'exchange_rate': exchange_rate,
-                'vehicle_value_eur': round(vehicle_value_eur, 2)
-            },
-            'transport_costs': {k: round(v, 2) for k, v in transport_costs.items()},
-            'omv': round(omv, 2),
-            'vrt_calculation': {
-                'co2_emissions': co2_emissions,
-                'co2_rate_percent': co2_rate,
-                'base_vrt': round(base_vrt, 2),
-                'minimum_vrt': minimum,
-                'final_vrt': round(final_vrt, 2)
-            },
-            'additional_costs': {
-                'motor_tax_annual': motor_tax,
-                'nct_test': 55 if vehicle_age_years >= 4 else 0,
-                'registration_fee': 102
-            },
-            'total_import_cost': round(vehicle_value_eur + transport_costs['total'] + final_vrt + 102, 2),
-            'calculation_date': datetime.now().isoformat()
-        }
+        return vrt_core.build_result(costs, vrt_core.purchase_details(
+            uk_price_gbp, exchange_rate, vehicle_value_eur,
+            import_origin, fuel_type, vehicle_age_years, transport_method
+        ))
     
-    def get_co2_rate(self, co2_emissions: int) -> int:
+    def _bands(self) -> vrt_core.BandTable:
+        if self._band_table.co2_bands != tuple(self.co2_bands):
+            self._band_table = vrt_core.BandTable(self.co2_bands)
+        return self._band_table
+    
+    def get_co2_rate(self, co2_emissions: int) -> float:
         """Get VRT percentage rate based on CO2 emissions"""
-        for (min_co2, max_co2), rate in self.co2_bands.items():
-            if min_co2 <= co2_emissions <= max_co2:
-                return rate
-        return 36
+        return self._bands().rate_and_minimum(co2_emissions)[0]
     
     def estimate_motor_tax(self, co2_emissions: int, fuel_type: str) -> int:
         """
         Estimate annual motor tax - simplified calculation
         Actual rates depend on CO2 emissions, fuel type, and year of registration
         """
-        if fuel_type.lower() == 'electric':
-            return 120  # Electric vehicle rate
-        
-        # Simplified CO2-based rates (verify current rates)
-        if co2_emissions <= 120:
-            return 200
-        elif co2_emissions <= 140:
-            return 270
-        elif co2_emissions <= 155:
-            return 330
-        elif co2_emissions <= 170:
-            return 481
-        elif co2_emissions <= 190:
-            return 677
-        else:
-            return 1200  # High emission vehicles
+        return vrt_core.motor_tax(co2_emissions, fuel_type)
 
 def main():
     calculator = EnhancedVRTCalculator()
@@ -208,14 +115,20 @@ def main():
     
     try:
         # Option to lookup by registration
-        lookup_option = input("Do you want to lookup vehicle by UK registration? (y/n): ")
+        lookup_option = input("Do you want to lookup vehicle specs by make and model? (y/n): ")
         
         if lookup_option.lower() == 'y':
-            registration = input("Enter UK registration: ").upper()
+            registration = input("Enter make/model/variant/year (e.g. Toyota Corolla 1.8 Hybrid 2020): ")
             vehicle_data = calculator.lookup_vehicle_by_reg(registration)
+            if not vehicle_data:
+                suggestions = get_spec_index().autocomplete(registration, limit=5)
+                if suggestions:
+                    print("Did you mean:")
+                    for suggestion in suggestions:
+                        print(f"  - {suggestion['label']}")
             
             if vehicle_data:
-                print("Vehicle found!")
+                print(f"Vehicle found: {vehicle_data['label']}")
                 # Use looked up data
                 co2_emissions = vehicle_data['co2_emissions']
                 fuel_type = vehicle_data['fuel_type']
@@ -233,10 +146,11 @@ def main():
         
         uk_price = float(input("Enter UK purchase price (GBP): £"))
         transport_method = input("Transport method (ferry/drive) [ferry]: ") or "ferry"
+        import_origin = input("Import origin (uk/ni) [uk]: ").strip().lower() or "uk"
         
         # Calculate comprehensive costs
         result = calculator.calculate_comprehensive_costs(
-            uk_price, co2_emissions, fuel_type, vehicle_age, transport_method
+            uk_price, co2_emissions, fuel_type, vehicle_age, transport_method, import_origin
         )
         
         # Display detailed results
@@ -261,6 +175,15 @@ def main():
         print(f"VRT Rate: {result['vrt_calculation']['co2_rate_percent']}%")
         print(f"VRT Amount: €{result['vrt_calculation']['final_vrt']:,.2f}")
         
+        print(f"\n🛃 CUSTOMS DUTY & VAT:")
+        if result['customs_duty_applicable']:
+            print(f"Customs Duty (10%): €{result['customs_duty']:,.2f}")
+        else:
+            print("Customs Duty: not applicable (Northern Ireland import)")
+        print(f"VAT Base: €{result['vat_calculation']['vat_base']:,.2f}")
+        print(f"VAT Amount ({result['vat_calculation']['vat_rate_percent']}%): "
+              f"€{result['vat_calculation']['vat_amount']:,.2f}")
+        
         print(f"\n📄 ADDITIONAL COSTS:")
         for cost_type, amount in result['additional_costs'].items():
             print(f"{cost_type.replace('_', ' ').title()}: €{amount:,.2f}")
@@ -273,12 +196,12 @@ def main():
         print(f"Insurance: €??? (get quotes from Irish insurers)")
         
         # Save detailed results
-        save_file = input("\nSave detailed results to JSON file? (y/n): ")
+        save_file = input("\nSave detailed results to history? (y/n): ")
         if save_file.lower() == 'y':
-            filename = f"vrt_detailed_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            with open(filename, 'w') as f:
-                json.dump(result, f, indent=2)
-            print(f"Results saved to {filename}")
+            store = HistoryStore(fsync='always')
+            store.append(result)
+            store.flush()
+            print(f"Results saved to {store.path} (view with: python3 history_store.py last)")
     
     except ValueError as e:
         print(f"❌ Error: Invalid input - {e}")
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Shared VRT calculation core
+Tariff constants and the landed-cost formula behind every calculator: the web
+app, both command line tools and the batch engine call into this module, and
+`python3 vrt_core.py` generates static/js/vrt_tariff.js for the quick estimate
+in app.js
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime
+from typing import Dict, Sequence, Tuple
+
+# Official VRT rates from Irish Revenue (Category A) - 2024
+# Format: (min_co2, max_co2, rate_percent, minimum_amount_eur)
+CO2_BANDS = (
+    (0, 50, 7, 140),
+    (51, 80, 9, 180),
+    (81, 85, 9.75, 195),
+    (86, 90, 10.5, 210),
+    (91, 95, 11.25, 225),
+    (96, 100, 12, 240),
+    (101, 105, 12.75, 255),
+    (106, 110, 13.5, 270),
+    (111, 115, 15.25, 305),
+    (116, 120, 16, 320),
+    (121, 125, 16.75, 335),
+    (126, 130, 17.5, 350),
+    (131, 135, 19.25, 385),
+    (136, 140, 20, 400),
+    (141, 145, 21.5, 430),
+    (146, 150, 25, 500),
+    (151, 155, 27.5, 550),
+    (156, 170, 30, 600),
+    (171, 190, 35, 700),
+    (191, float('inf'), 41, 820)
+)
+
+# Customs duty on UK imports (Northern Ireland is in the EU customs union)
+CUSTOMS_DUTY_RATE = 0.10
+VAT_RATE = 0.21
+REGISTRATION_FEE = 102
+
+# Transport estimates: ferry or drive cost, transit insurance on the vehicle value, clearance
+TRANSPORT_COSTS = {'ferry': 300, 'drive': 150}
+TRANSIT_INSURANCE_RATE = 0.015
+CUSTOMS_CLEARANCE = 50
+
+# Simplified age depreciation of VRT: 2% a year, at most 10%
+DEPRECIATION_PER_YEAR = 0.02
+MAX_DEPRECIATION = 0.1
+
+NCT_FEE = 55
+NCT_MIN_AGE_YEARS = 4
+
+# Annual motor tax (approximate rates for recent vehicles): (max_co2, rate)
+MOTOR_TAX_BANDS = (
+    (80, 120), (100, 170), (110, 190), (120, 200), (130, 270),
+    (140, 330), (155, 481), (170, 677), (190, 920), (float('inf'), 1200)
+)
+ELECTRIC_MOTOR_TAX = 120
+
+FALLBACK_EXCHANGE_RATE = 1.17
+
+TARIFF_JS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'js', 'vrt_tariff.js')
+
+
+def round_cents(value: float) -> float:
+    """Round to cents the way NumPy's round(2) does, so scalar and batch results agree"""
+    return round(value * 100) / 100
+
+
+class BandTable:
+    """
+    CO2 band table with a per-g/km table of (rate, minimum) for whole CO2 values
+    up to the last finite band, so lookups are a single index instead of a scan
+    """
+
+    def __init__(self, co2_bands: Sequence[Tuple] = CO2_BANDS):
+        self.co2_bands = tuple(co2_bands)
+        top = int(max((max_co2 for _, max_co2, _, _ in self.co2_bands if max_co2 != float('inf')), default=-1))
+        self.lookup = tuple(self._scan(co2) for co2 in range(top + 1))
+
+    def _scan(self, co2_emissions) -> Tuple[float, float]:
+        for min_co2, max_co2, rate, minimum in self.co2_bands:
+            if min_co2 <= co2_emissions <= max_co2:
+                return rate, minimum
+        # Default to the highest band if not found
+        return self.co2_bands[-1][2], self.co2_bands[-1][3]
+
+    def rate_and_minimum(self, co2_emissions) -> Tuple[float, float]:
+        """VRT percentage rate and minimum amount for the given emissions"""
+        if isinstance(co2_emissions, int) and 0 <= co2_emissions < len(self.lookup):
+            return self.lookup[co2_emissions]
+        return self._scan(co2_emissions)
+
+    def label(self, co2_emissions) -> str:
+        """Band label such as '146-150' or '191+'"""
+        for min_co2, max_co2, _, _ in self.co2_bands:
+            if min_co2 <= co2_emissions <= max_co2:
+                return f"{min_co2}+" if max_co2 == float('inf') else f"{min_co2}-{max_co2}"
+        return f"{self.co2_bands[-1][0]}+"
+
+    @property
+    def version(self) -> str:
+        """Short hash of the band table - changes whenever the bands change"""
+        return hashlib.sha256(repr(list(self.co2_bands)).encode('utf-8')).hexdigest()[:12]
+
+
+DEFAULT_BANDS = BandTable()
+
+
+def transport_costs(vehicle_value_eur: float, transport_method: str = 'ferry') -> Dict[str, float]:
+    """Transport, transit insurance and customs clearance (unknown methods cost as driving)"""
+    transport = TRANSPORT_COSTS.get(transport_method.lower(), TRANSPORT_COSTS['drive'])
+    insurance = vehicle_value_eur * TRANSIT_INSURANCE_RATE
+    return {
+        'transport': transport,
+        'insurance': insurance,
+        'customs_clearance': CUSTOMS_CLEARANCE,
+        'total': transport + insurance + CUSTOMS_CLEARANCE
+    }
+
+
+def depreciation_rate(vehicle_age_years: int) -> float:
+    return min(vehicle_age_years * DEPRECIATION_PER_YEAR, MAX_DEPRECIATION) if vehicle_age_years > 0 else 0.0
+
+
+def motor_tax(co2_emissions, fuel_type: str) -> int:
+    """Estimated annual motor tax - actual rates depend on year of registration"""
+    if (fuel_type or '').lower() == 'electric':
+        return ELECTRIC_MOTOR_TAX
+    for max_co2, rate in MOTOR_TAX_BANDS:
+        if co2_emissions <= max_co2:
+            return rate
+    return MOTOR_TAX_BANDS[-1][1]
+
+
+def price_from_omv(omv: float, vehicle_value_eur: float, co2_rate: float, vrt_minimum: float,
+                   vehicle_age_years: int = 0, import_origin: str = 'uk') -> Dict[str, float]:
+    """Customs duty, VRT, VAT and total for a known OMV (all unrounded)"""
+    # Customs Duty (10% of vehicle value for UK, 0% for Northern Ireland)
+    customs_duty = vehicle_value_eur * CUSTOMS_DUTY_RATE if import_origin.lower() == 'uk' else 0.0
+
+    # VRT on OMV at the band rate, less age depreciation
+    base_vrt = omv * (co2_rate / 100)
+    if vehicle_age_years > 0:
+        base_vrt = base_vrt * (1 - depreciation_rate(vehicle_age_years))
+
+    # Apply minimum VRT (whichever is greater: calculated VRT or minimum)
+    final_vrt = max(base_vrt, vrt_minimum)
+
+    # VAT (21% on vehicle value + customs duty + VRT)
+    vat_base = vehicle_value_eur + customs_duty + final_vrt
+    vat_amount = vat_base * VAT_RATE
+
+    return {
+        'customs_duty': customs_duty,
+        'base_vrt': base_vrt,
+        'final_vrt': final_vrt,
+        'vat_base': vat_base,
+        'vat_amount': vat_amount,
+        'total_import_cost': omv + customs_duty + final_vrt + vat_amount + REGISTRATION_FEE
+    }
+
+
+def price_scenario(vehicle_value_eur: float, co2_rate: float, vrt_minimum: float,
+                   vehicle_age_years: int = 0, transport_method: str = 'ferry',
+                   import_origin: str = 'uk') -> Dict:
+    """Stages that vary per scenario once the band is known: transport, OMV, duty, VRT, VAT"""
+    transport = transport_costs(vehicle_value_eur, transport_method)
+    omv = vehicle_value_eur + transport['total']
+    costs = price_from_omv(omv, vehicle_value_eur, co2_rate, vrt_minimum, vehicle_age_years, import_origin)
+    costs.update(
+        vehicle_value_eur=vehicle_value_eur,
+        transport_costs=transport,
+        omv=omv,
+        co2_rate_percent=co2_rate,
+        minimum_vrt=vrt_minimum,
+        vehicle_age_years=vehicle_age_years,
+        import_origin=import_origin
+    )
+    return costs
+
+
+def calculate_costs(vehicle_value_eur: float, co2_emissions, fuel_type: str = 'petrol',
+                    vehicle_age_years: int = 0, transport_method: str = 'ferry',
+                    import_origin: str = 'uk', bands: BandTable = DEFAULT_BANDS) -> Dict:
+    """Every cost stage for one vehicle (unrounded); see build_result for the API layout"""
+    co2_rate, vrt_minimum = bands.rate_and_minimum(co2_emissions)
+    costs = price_scenario(vehicle_value_eur, co2_rate, vrt_minimum, vehicle_age_years,
+                           transport_method, import_origin)
+    costs.update(co2_emissions=co2_emissions, motor_tax_annual=motor_tax(co2_emissions, fuel_type))
+    return costs
+
+
+def purchase_details(uk_price_gbp: float, exchange_rate: float, vehicle_value_eur: float,
+                     import_origin: str = 'uk', fuel_type: str = 'petrol', vehicle_age_years: int = 0,
+                     transport_method: str = 'ferry', purchase_price: float = None,
+                     source_currency: str = 'GBP') -> Dict:
+    """Purchase details block of a result, rounded the same way for every calculator"""
+    return {
+        'uk_price_gbp': uk_price_gbp,
+        'purchase_price': uk_price_gbp if purchase_price is None else purchase_price,
+        'source_currency': source_currency,
+        'exchange_rate': round(exchange_rate, 4),
+        # Unrounded, so stored quotes can be repriced to the cent (repricing.py)
+        'exchange_rate_exact': exchange_rate,
+        'vehicle_value_eur': round_cents(vehicle_value_eur),
+        'import_origin': import_origin.upper(),
+        'fuel_type': fuel_type,
+        'vehicle_age_years': vehicle_age_years,
+        'transport_method': transport_method
+    }
+
+
+def build_result(costs: Dict, purchase_details: Dict) -> Dict:
+    """Nested, rounded result returned by the web app and the enhanced calculator"""
+    return {
+        'purchase_details': purchase_details,
+        'transport_costs': {k: round_cents(v) for k, v in costs['transport_costs'].items()},
+        'omv': round_cents(costs['omv']),
+        'customs_duty': round_cents(costs['customs_duty']),
+        'customs_duty_applicable': costs['import_origin'].lower() == 'uk',
+        'vrt_calculation': {
+            'co2_emissions': costs['co2_emissions'],
+            'co2_rate_percent': costs['co2_rate_percent'],
+            'base_vrt': round_cents(costs['base_vrt']),
+            'minimum_vrt': costs['minimum_vrt'],
+            'final_vrt': round_cents(costs['final_vrt'])
+        },
+        'vat_calculation': {
+            'vat_base': round_cents(costs['vat_base']),
+            'vat_rate_percent': round(VAT_RATE * 100),
+            'vat_amount': round_cents(costs['vat_amount'])
+        },
+        'additional_costs': {
+            'motor_tax_annual': costs['motor_tax_annual'],
+            'nct_test': NCT_FEE if costs['vehicle_age_years'] >= NCT_MIN_AGE_YEARS else 0,
+            'registration_fee': REGISTRATION_FEE
+        },
+        'total_import_cost': round_cents(costs['total_import_cost']),
+        'calculation_date': datetime.now().isoformat()
+    }
+
+
+def tariff_table(bands: BandTable = DEFAULT_BANDS) -> Dict:
+    """Tariff constants in the layout app.js expects (null max_co2 for the open top band)"""
+    return {
+        'version': bands.version,
+        'co2Bands': [[min_co2, None if max_co2 == float('inf') else max_co2, rate, minimum]
+                     for min_co2, max_co2, rate, minimum in bands.co2_bands],
+        'customsDutyRate': CUSTOMS_DUTY_RATE,
+        'vatRate': VAT_RATE,
+        'registrationFee': REGISTRATION_FEE,
+        'transportCosts': TRANSPORT_COSTS,
+        'transitInsuranceRate': TRANSIT_INSURANCE_RATE,
+        'customsClearance': CUSTOMS_CLEARANCE,
+        'depreciationPerYear': DEPRECIATION_PER_YEAR,
+        'maxDepreciation': MAX_DEPRECIATION,
+        'fallbackExchangeRate': FALLBACK_EXCHANGE_RATE
+    }
+
+
+def render_tariff_js(bands: BandTable = DEFAULT_BANDS) -> str:
+    return (
+        "// Generated by vrt_core.py from the shared calculation core - do not edit.\n"
+        "// Regenerate with: python3 vrt_core.py\n"
+        f"const VRT_TARIFF = {json.dumps(tariff_table(bands), indent=4)};\n"
+    )
+
+
+def write_tariff_js(path: str = TARIFF_JS_PATH, bands: BandTable = DEFAULT_BANDS) -> bool:
+    """Write the generated band table for app.js - returns True if the file changed"""
+    content = render_tariff_js(bands)
+    try:
+        with open(path) as f:
+            if f.read() == content:
+                return False
+    except OSError:
+        pass
+    with open(path, 'w') as f:
+        f.write(content)
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the app.js tariff table from the calculation core")
+    parser.add_argument('--check', action='store_true',
+                        help="Exit non-zero if static/js/vrt_tariff.js is out of date instead of writing it")
+    args = parser.parse_args()
+
+    if args.check:
+        try:
+            with open(TARIFF_JS_PATH) as f:
+                current = f.read() == render_tariff_js()
+        except OSError:
+            current = False
+        if not current:
+            print(f"{TARIFF_JS_PATH} is out of date - run: python3 vrt_core.py")
+            sys.exit(1)
+        print(f"{TARIFF_JS_PATH} is up to date (tariff {DEFAULT_BANDS.version})")
+        return
+
+    changed = write_tariff_js()
+    print(f"{'Wrote' if changed else 'Unchanged'} {TARIFF_JS_PATH} (tariff {DEFAULT_BANDS.version})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Pre-fork warmup for running the VRT Calculator under gunicorn --preload
+Everything built here is created once in the master process and then shared
+copy-on-write with every worker
+"""
+
+import gc
+import time
+
+from flask import render_template
+
+from vehicle_specs import get_spec_index
+
+TEMPLATES = ('base.html', 'index.html', 'results.html', 'about.html')
+
+# Representative inputs that touch the common code paths (both origins, both
+# transport methods, depreciation, minimum VRT and the top band)
+SYNTHETIC_CALCULATIONS = [
+    (15000, 150, 'petrol', 0, 'ferry', 'uk'),
+    (8000, 45, 'electric', 5, 'drive', 'ni'),
+    (30000, 210, 'diesel', 3, 'ferry', 'ni'),
+    (2000, 120, 'hybrid', 8, 'drive', 'uk'),
+]
+
+
+def warmup(flask_app=None, calculator=None, freeze=True):
+    """
+    Build lookup tables, map the vehicle spec index, compile templates, prime the rate cache and run a few
+    synthetic calculations, then move everything into the permanent GC generation
+    Returns timings (seconds) for each phase
+    """
+    if flask_app is None or calculator is None:
+        from app import app as default_app, calculator as default_calculator
+        flask_app = flask_app or default_app
+        calculator = calculator or default_calculator
+
+    timings = {}
+
+    start = time.perf_counter()
+    calculator.build_lookup_tables()
+    timings['lookup_tables'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    try:
+        get_spec_index()
+        timings['vehicle_specs'] = time.perf_counter() - start
+    except (OSError, ValueError) as e:
+        # A read-only deploy without a prebuilt index - the spec routes answer 503 instead
+        print(f"Skipping vehicle spec index: {e}")
+
+    start = time.perf_counter()
+    for name in TEMPLATES:
+        flask_app.jinja_env.get_template(name)
+    timings['templates'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    calculator.get_rate_snapshot()
+    timings['rate_cache'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = None
+    for args in SYNTHETIC_CALCULATIONS:
+        result = calculator.calculate_comprehensive_costs(*args)
+    # Render once so Flask's request machinery and template globals are warm too
+    with flask_app.test_request_context('/calculate', method='POST'):
+        render_template('results.html', result=result)
+        render_template('index.html')
+        render_template('about.html')
+    timings['synthetic_calculations'] = time.perf_counter() - start
+
+    if freeze:
+        # Collect now so garbage isn't frozen, then freeze the survivors so the
+        # workers' GC never touches (and so never dirties) these pages
+        gc.collect()
+        gc.freeze()
+
+    return timings